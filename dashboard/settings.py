@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -38,6 +39,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'dashboard_app'
 ]
 
@@ -88,6 +90,51 @@ WSGI_APPLICATION = 'dashboard.wsgi.application'
 
 
 
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    # Rendered dashboard charts, keyed by kind, year range and corpus epoch
+    'charts': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'dashboard-charts',
+        'TIMEOUT': None,
+        'OPTIONS': {'MAX_ENTRIES': 256},
+    },
+}
+
+
+# Summarization inference server (python manage.py summary_server; the "summarizer" service in compose.yaml).
+# When set, web workers send summaries to this Unix socket instead of loading DistilBART themselves,
+# and paper pages poll /api/summary for the result.
+SUMMARY_SERVER_SOCKET = os.environ.get("SUMMARY_SERVER_SOCKET") or None
+SUMMARY_SERVER_TIMEOUT = 30
+
+# Seconds a paper page may wait for the model summary before serving the TF-IDF one (the model one follows)
+SUMMARY_LATENCY_BUDGET = 1.5
+
+# Opt-in: paper pages stream cold summaries token by token from /api/summary/stream. Streams need the
+# model in every web worker (ignored when SUMMARY_SERVER_SOCKET is set) and skip the latency budget above.
+SUMMARY_STREAMING = False
+# Longest a stream holds a web thread; then it tells the page to poll /api/summary while generation goes on
+SUMMARY_STREAM_SECONDS = 15
+
+# Corpus IDF for the TF-IDF fallback summarizer (python manage.py fit_idf); per-abstract IDF until it exists
+SUMMARY_IDF_PATH = BASE_DIR / "dashboard_app" / "logs" / "abstract_idf.npy"
+
+# DistilBART inference backend: "fp32", "int8" (dynamic quantisation) or "onnx" (needs optimum[onnxruntime]).
+# Compare them with: python manage.py benchmark_summarizer
+SUMMARIZER_BACKEND = "fp32"
+SUMMARIZER_ONNX_PATH = None  # directory from `optimum-cli export onnx`; exported on load when unset
+
+# Models each web worker loads at startup (dashboard/wsgi.py, in the background); the rest load on first use.
+# Without SUMMARY_SERVER_SOCKET every worker holds its own DistilBART copy (over 1 GB each with --workers=4).
+WARM_MODELS = ["keybert"] + ([] if SUMMARY_SERVER_SOCKET else ["summarizer"])
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -14,3 +14,12 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'dashboard.settings')
 
 application = get_wsgi_application()
+
+# Build the in-memory typeahead index in the background (suggestions stay empty until it is ready)
+from dashboard_app import suggest_utils
+suggest_utils.warm_suggest_index()
+
+# Load models (settings.WARM_MODELS) in the background: loading them here, before the worker's first
+# heartbeat, can outlast gunicorn's --timeout and get workers killed and restarted in a loop
+from dashboard_app import model_utils
+model_utils.warm_models_in_background()
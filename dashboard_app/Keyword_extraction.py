@@ -9,14 +9,17 @@ nltk.download('stopwords', quiet=True)
 nltk.download('punkt', quiet=True)
 nltk.download('punkt_tab', quiet=True)
 
-from keybert import KeyBERT
 from nltk.corpus import stopwords
 from dashboard_app.models import Papers, Keywords, Keywords_Paper
-from dashboard_app import const
+from dashboard_app import const, rollup_utils, model_utils
 import random
 
 
-kw_model = KeyBERT(model="all-MiniLM-L6-v2")
+def get_kw_model():
+    """The process-wide KeyBERT model, loaded on first use."""
+    return model_utils.get_model("keybert")
+
+
 custom_stopwords = stopwords.words('english')
 
 # Add your own words (case-insensitive!)
@@ -34,6 +37,7 @@ def extract_keywords_from_text(abstract, top_n=30):
     if not abstract or not abstract.strip():
         return []
 
+    kw_model = get_kw_model()
     keywords = kw_model.extract_keywords(
         abstract,
         keyphrase_ngram_range=(1, 5),  
@@ -71,6 +75,12 @@ def attach_keywords_to_paper(paper, top_n=5):
         print(f"No keywords extracted for '{paper.title}'.")
         return
 
+    link_keywords(paper, extracted_keywords)
+    print(f"Added {len(extracted_keywords)} keywords to '{paper.title}'.")
+
+
+def link_keywords(paper, extracted_keywords):
+    """Creates missing Keywords rows and links them to the paper."""
     for kw in extracted_keywords:
         kw = kw.strip().lower()
 
@@ -84,9 +94,10 @@ def attach_keywords_to_paper(paper, top_n=5):
             keyword_obj = Keywords.objects.create(id=custom_id, keyword=kw)
 
         # Link keyword ↔ paper
-        Keywords_Paper.objects.get_or_create(keyword_id=keyword_obj, doi=paper)
+        _, linked = Keywords_Paper.objects.get_or_create(keyword_id=keyword_obj, doi=paper)
+        if linked:
+            rollup_utils.record_keyword_links([(keyword_obj.id, paper.publishing_year)])
 
-    print(f"Added {len(extracted_keywords)} keywords to '{paper.title}'.")
         
 def main():
     papers = list(Papers.objects.all())  # Ensure we can get a random element
@@ -109,41 +120,58 @@ if __name__=="__main__":
     
 class KeywordExtractor():
     def __init__(self, top_n=5):
-        self.model =  KeyBERT(model="all-MiniLM-L6-v2")
-        
-        self.custom_stopwords = stopwords.words('english')
-        self.custom_stopwords.extend([
-            'study', 'result', 'results', 'paper', 'approach', 'method', 'methods',
-                'proposed', 'research', 'system', 'data', 'analysis', 'problem', 'based',
-                'use', 'using', 'model', 'models', 'experiment', 'experiments', 'performance',
-                'propose', 'provide', 'present', 'different', 'new', 'show', 'demonstrate',
-                'high', 'low', 'good', 'better', 'work', 'works', 'set', 'used', 'done',
-                'important', 'various', 'including', 'example', 'number', 'paper', 'aim', 'jats'
-        ])
+        # Cheap to construct: the KeyBERT model is shared by every extractor in the process
+        self.custom_stopwords = custom_stopwords
         self.top_n = top_n
+
+    @property
+    def model(self):
+        return get_kw_model()
         
     def ExtractTopics(self, text):
         
         if text is None:
             raise ValueError("No text has been passed to the extractor")
         
-        preprocessed_keywords = self.model.extract_keywords(
-            text,
-            keyphrase_ngram_range=(1, 5),  
-            stop_words=self.custom_stopwords,
-            use_mmr=True,  # diversity
-            diversity=0.25,
-            top_n=self.top_n**2,
-        )
-        
-        new_text = ' '.join([kw for kw, _ in preprocessed_keywords])
-    
-        procesed_keywords = self.model.extract_keywords(
-            new_text,
-            keyphrase_ngram_range=(1, 2),  
-            stop_words=self.custom_stopwords,
-            use_mmr=False, 
-            top_n=self.top_n,
-        )
-        
-        return [kw for kw,_ in procesed_keywords]
\ No newline at end of file
+        return self.ExtractTopicsBatch([text])[0]
+
+    def ExtractTopicsBatch(self, texts, batch_size=64):
+        """
+        ExtractTopics for many abstracts at once. Each pass is one extract_keywords call per batch,
+        so documents and the candidate phrases of the whole batch are embedded together.
+        """
+        topics = [[] for _ in texts]
+        documents = [(i, text) for i, text in enumerate(texts) if text and text.strip()]
+
+        for start in range(0, len(documents), batch_size):
+            batch = documents[start:start + batch_size]
+
+            preprocessed_keywords = self._extract(
+                [text for _, text in batch],
+                keyphrase_ngram_range=(1, 5),
+                use_mmr=True,  # diversity
+                diversity=0.25,
+                top_n=self.top_n**2,
+            )
+
+            # Second pass over the joined first-pass keywords (skipping documents that had none)
+            new_texts = [(i, ' '.join([kw for kw, _ in keywords])) for (i, _), keywords in zip(batch, preprocessed_keywords)]
+            new_texts = [(i, text) for i, text in new_texts if text]
+            if not new_texts:
+                continue
+
+            procesed_keywords = self._extract(
+                [text for _, text in new_texts],
+                keyphrase_ngram_range=(1, 2),
+                use_mmr=False,
+                top_n=self.top_n,
+            )
+            for (i, _), keywords in zip(new_texts, procesed_keywords):
+                topics[i] = [kw for kw, _ in keywords]
+
+        return topics
+
+    def _extract(self, docs, **options):
+        keywords = self.model.extract_keywords(docs, stop_words=self.custom_stopwords, **options)
+        # KeyBERT returns a flat list when given a single document
+        return [keywords] if len(docs) == 1 else keywords
@@ -0,0 +1,153 @@
+import threading
+import time
+import numpy as np
+from django.db import connection
+from .models import Keywords, Keywords_Year
+
+
+# The corpus epoch moves with every ingested paper; topic analytics follow it at most this often
+TOPIC_REFRESH_SECONDS = 30
+
+
+class TopicMatrix:
+    """
+    Topic counts as a dense keywords x years matrix over a year range, built from one
+    aggregated query on the Keywords_Year rollup. Every query is a column slice plus a
+    vectorised reduction, so per-request analytics do not depend on how many papers the
+    corpus holds.
+    """
+
+    def __init__(self, keyword_ids, years, counts, range_total=None):
+        self.keyword_ids = np.asarray(keyword_ids)
+        self.years = np.asarray(years, dtype=np.int32)     # sorted, only years that have papers
+        self.counts = np.asarray(counts, dtype=np.int32)   # shape (len(keyword_ids), len(years))
+        # Papers of every topic in the range, including topics left out of the matrix
+        self.range_total = int(self.counts.sum()) if range_total is None else range_total
+
+    @classmethod
+    def from_rollup(cls, min_year, max_year, top_n=None):
+        """
+        The [min_year, max_year] slice of the rollup. With `top_n`, window functions rank the
+        topics in the database and only the rows of the top_n overall and the top_n in max_year
+        reach Python (ties broken by keyword id, as _top does).
+        """
+        keyword_column = Keywords_Year._meta.get_field('keyword_id').column
+        sql = f"""
+            WITH per_topic AS (
+                SELECT ky.{keyword_column} AS keyword_id, ky.publishing_year, ky.paper_count,
+                       SUM(ky.paper_count) OVER (PARTITION BY ky.{keyword_column}) AS keyword_total,
+                       SUM(CASE WHEN ky.publishing_year = %s THEN ky.paper_count ELSE 0 END)
+                           OVER (PARTITION BY ky.{keyword_column}) AS max_year_count,
+                       SUM(ky.paper_count) OVER () AS range_total
+                FROM {Keywords_Year._meta.db_table} ky
+                WHERE ky.publishing_year BETWEEN %s AND %s AND ky.paper_count > 0
+            ), ranked AS (
+                SELECT per_topic.*,
+                       DENSE_RANK() OVER (ORDER BY keyword_total DESC, keyword_id COLLATE "C") AS total_rank,
+                       DENSE_RANK() OVER (ORDER BY max_year_count DESC, keyword_id COLLATE "C") AS trend_rank
+                FROM per_topic
+            )
+            SELECT keyword_id, publishing_year, paper_count, range_total FROM ranked
+            WHERE %s IS NULL OR total_rank <= %s OR (trend_rank <= %s AND max_year_count > 0)
+        """
+        with connection.cursor() as cursor:
+            cursor.execute(sql, [max_year, min_year, max_year, top_n, top_n, top_n])
+            rows = cursor.fetchall()
+        keyword_column, year_column, count_column, total_column = zip(*rows) if rows else ((), (), (), (0,))
+
+        keyword_ids, keyword_index = np.unique(np.asarray(keyword_column, dtype=object), return_inverse=True)
+        years, year_index = np.unique(np.asarray(year_column, dtype=np.int32), return_inverse=True)
+        counts = np.zeros((len(keyword_ids), len(years)), dtype=np.int32)
+        np.add.at(counts, (keyword_index, year_index), np.asarray(count_column, dtype=np.int32))
+        return cls(keyword_ids, years, counts, int(total_column[0]))
+
+    # --- Slicing helpers ---
+    def year_columns(self, min_year, max_year):
+        start = np.searchsorted(self.years, min_year, side='left')
+        stop = np.searchsorted(self.years, max_year, side='right')
+        return slice(start, stop)
+
+    def yearly(self, rows, min_year, max_year):
+        """Papers per topic for every year in [min_year, max_year], zero for years without papers."""
+        all_years = np.arange(min_year, max_year + 1)
+        yearly = np.zeros((len(rows), len(all_years)), dtype=np.int32)
+        if len(self.years):
+            columns = np.minimum(np.searchsorted(self.years, all_years), len(self.years) - 1)
+            present = self.years[columns] == all_years
+            yearly[:, present] = self.counts[np.ix_(rows, columns[present])]
+        return yearly
+
+    def _top(self, values, n):
+        """
+        Row indices of the n largest positive values, ties broken by keyword id. Rows with no
+        papers in the range never rank; only rows at or above the n-th value are sorted.
+        """
+        candidates = np.flatnonzero(values > 0)
+        if len(candidates) > n:
+            if n <= 0:
+                return np.empty(0, dtype=np.intp)
+            threshold = np.partition(values[candidates], len(candidates) - n)[len(candidates) - n]
+            candidates = candidates[values[candidates] >= threshold]
+        order = np.lexsort((self.keyword_ids[candidates].astype(str), -values[candidates]))
+        return candidates[order][:n]
+
+    # --- Analytics ---
+    def totals(self, min_year, max_year):
+        return self.counts[:, self.year_columns(min_year, max_year)].sum(axis=1)
+
+    def top_n(self, n, min_year, max_year):
+        totals = self.totals(min_year, max_year)
+        rows = self._top(totals, n)
+        return rows, totals[rows]
+
+    def share_of_total(self, min_year, max_year):
+        totals = self.totals(min_year, max_year)
+        grand_total = totals.sum()
+        return totals / grand_total if grand_total else totals.astype(np.float64)
+
+    def trending(self, year, n):
+        """Rows of the n topics with the most papers in `year`."""
+        columns = self.year_columns(year, year)
+        return self._top(self.counts[:, columns].sum(axis=1), n)
+
+    def cumulative(self, rows, min_year, max_year):
+        """Running totals per year in [min_year, max_year]; years without papers carry the total forward."""
+        return np.cumsum(self.yearly(rows, min_year, max_year), axis=1)
+
+    def year_over_year(self, rows, min_year, max_year):
+        """Change in papers per year against the previous year."""
+        return np.diff(self.yearly(rows, min_year - 1, max_year), axis=1)
+
+    def growth_rate(self, rows, min_year, max_year):
+        """Relative year-over-year change (nan where the previous year had no papers)."""
+        yearly = self.yearly(rows, min_year - 1, max_year)
+        previous, current = yearly[:, :-1], yearly[:, 1:]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return np.where(previous > 0, (current - previous) / previous, np.nan)
+
+    def keyword_names(self, rows):
+        names = dict(Keywords.objects.filter(id__in=self.keyword_ids[rows].tolist()).values_list('id', 'keyword'))
+        return [names.get(keyword_id, keyword_id) for keyword_id in self.keyword_ids[rows]]
+
+
+# The epoch topic analytics are served at, per process: (epoch, when it was adopted)
+_served_lock = threading.Lock()
+_served = None
+
+
+def served_epoch(epoch):
+    """
+    The epoch to compute (and cache) topic analytics at: `epoch`, unless the one adopted less
+    than TOPIC_REFRESH_SECONDS ago is older, so ingest bursts rebuild them at most that often.
+    """
+    global _served
+    with _served_lock:
+        now = time.monotonic()
+        if _served is None or epoch < _served[0] or (epoch > _served[0] and now - _served[1] >= TOPIC_REFRESH_SECONDS):
+            _served = (epoch, now)
+        return _served[0]
+
+
+def reset_served_epoch():
+    global _served
+    _served = None
@@ -0,0 +1,192 @@
+import threading
+import time
+import numpy as np
+from django.db import connection
+from .models import Papers, Paper_Embedding
+from . import rollup_utils, model_utils
+
+
+# Same sentence-transformer KeyBERT already loads for keyword extraction
+EMBEDDING_MODEL = model_utils.KEYBERT_MODEL
+EMBEDDING_EPOCH = "embeddings"
+
+# all-MiniLM-L6-v2 output size (shape of the index before anything has been embedded)
+EMBEDDING_DIM = 384
+
+# Above this many papers the index is partitioned (IVF) instead of scanning every vector
+IVF_MIN_PAPERS = 20000
+IVF_PROBES = 8
+IVF_ITERATIONS = 10
+
+
+# --- Encoding ---
+def _encoder():
+    # The KeyBERT model is loaded once per process, only by processes that embed or extract keywords
+    return model_utils.get_model("keybert").model
+
+
+def paper_text(title, abstract):
+    return f"{title or ''}. {abstract or ''}".strip()
+
+
+def embed_texts(texts):
+    """Returns L2-normalised float32 embeddings, one row per text."""
+    vectors = np.asarray(_encoder().embed(list(texts)), dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.where(norms > 0, norms, 1)
+
+
+def store_embeddings(papers):
+    """Embeds the given papers once and upserts their vectors."""
+    papers = [paper for paper in papers if paper.title or paper.abstract]
+    if not papers:
+        return 0
+
+    vectors = embed_texts(paper_text(paper.title, paper.abstract) for paper in papers)
+    Paper_Embedding.objects.bulk_create(
+        [
+            Paper_Embedding(doi_id=paper.doi, vector=vector.tobytes(), model_name=EMBEDDING_MODEL)
+            for paper, vector in zip(papers, vectors)
+        ],
+        update_conflicts=True,
+        unique_fields=["doi"],
+        update_fields=["vector", "model_name"],
+    )
+    rollup_utils.bump_epoch(EMBEDDING_EPOCH)
+    return len(papers)
+
+
+# --- Index ---
+class VectorIndex:
+    """
+    In-process cosine-similarity index over the stored paper embeddings.
+    Small corpora are scanned with one matrix-vector product; large ones are split into
+    k-means partitions and only the partitions closest to the query are scanned.
+    """
+
+    def __init__(self, dois, vectors, partitioned=None):
+        self.dois = np.asarray(dois, dtype=object)
+        vectors = np.asarray(vectors, dtype=np.float32)
+        self.vectors = vectors.reshape(len(self.dois), -1) if len(self.dois) else np.zeros((0, EMBEDDING_DIM), dtype=np.float32)
+        self.centroids, self.lists = None, None
+        if partitioned is None:
+            partitioned = len(self.dois) >= IVF_MIN_PAPERS
+        if partitioned and len(self.dois):
+            self._partition()
+
+    @classmethod
+    def from_db(cls):
+        rows = list(Paper_Embedding.objects.filter(model_name=EMBEDDING_MODEL).values_list("doi_id", "vector"))
+        dois = [doi for doi, _ in rows]
+        vectors = np.frombuffer(b"".join(bytes(vector) for _, vector in rows), dtype=np.float32)
+        return cls(dois, vectors)
+
+    def _partition(self):
+        count = len(self.dois)
+        clusters = max(1, int(np.sqrt(count)))
+        rng = np.random.default_rng(0)
+        centroids = self.vectors[rng.choice(count, clusters, replace=False)]
+        for _ in range(IVF_ITERATIONS):
+            assignment = np.argmax(self.vectors @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assignment, self.vectors)
+            norms = np.linalg.norm(sums, axis=1, keepdims=True)
+            centroids = np.where(norms > 0, sums / np.where(norms > 0, norms, 1), centroids)
+
+        assignment = np.argmax(self.vectors @ centroids.T, axis=1)
+        order = np.argsort(assignment, kind="stable")
+        bounds = np.searchsorted(assignment[order], np.arange(clusters + 1))
+        self.centroids = centroids
+        self.lists = [order[bounds[i]:bounds[i + 1]] for i in range(clusters)]
+
+    def _candidates(self, query_vector):
+        if self.centroids is None:
+            return None
+        probes = np.argsort(-(self.centroids @ query_vector))[:IVF_PROBES]
+        return np.concatenate([self.lists[i] for i in probes])
+
+    def search(self, query_vector, k=10):
+        """Returns [(doi, similarity)] of the k nearest papers, most similar first."""
+        if not len(self.dois):
+            return []
+        candidates = self._candidates(query_vector)
+        vectors = self.vectors if candidates is None else self.vectors[candidates]
+        scores = vectors @ query_vector
+
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind="stable")]
+        rows = top if candidates is None else candidates[top]
+        return list(zip(self.dois[rows].tolist(), scores[top].tolist()))
+
+
+# One index per process. Only the first build happens in a request; after that, when new
+# embeddings are stored, the index is rebuilt in a background thread (one at a time, at most
+# every INDEX_REFRESH_SECONDS) while requests keep searching the previous one.
+INDEX_REFRESH_SECONDS = 30
+
+_index_lock = threading.Lock()
+_index = None          # (embeddings epoch it was built at, VectorIndex)
+_rebuilding = False
+_last_build = 0.0
+
+
+def get_vector_index(epoch):
+    global _index, _last_build
+    index = _index
+    if index is None:
+        with _index_lock:
+            if _index is None:
+                _index = (epoch, VectorIndex.from_db())
+                _last_build = time.monotonic()
+            index = _index
+    elif index[0] != epoch:
+        _schedule_rebuild(epoch)
+    return index[1]
+
+
+def index_is_current(epoch):
+    """Whether searches see every embedding stored up to `epoch` (results may be cached)."""
+    index = _index
+    return index is not None and index[0] == epoch
+
+
+def _schedule_rebuild(epoch):
+    global _rebuilding
+    with _index_lock:
+        if _rebuilding or time.monotonic() - _last_build < INDEX_REFRESH_SECONDS:
+            return
+        _rebuilding = True
+    threading.Thread(target=_rebuild, args=(epoch,), name="vector-index-rebuild", daemon=True).start()
+
+
+def _rebuild(epoch):
+    global _index, _rebuilding, _last_build
+    try:
+        _index = (epoch, VectorIndex.from_db())
+    except Exception as e:
+        print(f"[WARN] Vector index rebuild failed, keeping the previous index: {e}")
+    finally:
+        connection.close()  # the thread's own connection
+        with _index_lock:
+            _last_build = time.monotonic()
+            _rebuilding = False
+
+
+def clear_vector_index():
+    global _index
+    _index = None
+
+
+def Semantic_Search(query, k=10):
+    """Papers most similar in meaning to `query`, each annotated with its cosine `similarity`."""
+    index = get_vector_index(rollup_utils.current_epoch(EMBEDDING_EPOCH))
+    hits = index.search(embed_texts([query])[0], k)
+    papers = Papers.objects.defer("abstract", "search_vector").in_bulk([doi for doi, _ in hits])
+
+    results = []
+    for doi, similarity in hits:
+        if doi in papers:
+            papers[doi].similarity = similarity
+            results.append(papers[doi])
+    return results
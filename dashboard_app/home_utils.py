@@ -9,48 +9,51 @@ from dashboard_app.scrapers import utils
 import logging
 from django.utils import timezone
 from io import BytesIO
-from django.db.models import Count, Max
-from dashboard_app.models import Papers, Keywords, Keywords_Paper
+from django.core.cache import caches
+from dashboard_app.models import Papers, Keywords, Papers_Year, Keywords_Year
+from dashboard_app import rollup_utils, analytics_utils
 import base64
 from django.shortcuts import render
+from django.http import JsonResponse, HttpResponseBadRequest
 import matplotlib
-matplotlib.use("Agg") 
+matplotlib.use("Agg")
 import matplotlib.pyplot as plt
-from collections import Counter, defaultdict
+from collections import defaultdict
+
+
+# Rendered charts only change when the scrapers write, so they are cached per corpus epoch
+CHART_CACHE = caches["charts"]
+_chart_cache_epoch = None
 
 
 def Get_All_Papers(limit=None):
     papers = Papers.objects.all() if not limit else Papers.objects.all()[:limit]
     return papers
 
-def DomainAnalysis(request):
-    
-     # --- Read search range from query parameters ---
-    try:
-        min_year = int(request.GET.get("min_year")) if request.GET.get("min_year") else  Papers.objects.order_by('publishing_year').first().publishing_year
-        max_year = int(request.GET.get("max_year")) if request.GET.get("max_year") else  Papers.objects.order_by('-publishing_year').first().publishing_year
-    except ValueError:
-        min_year, max_year = None, None
-
-    # --- Filter papers by year range ---
-    papers = Papers.objects.all()
-    if min_year:
-        papers = papers.filter(publishing_year__gte=min_year)
-    if max_year:
-        papers = papers.filter(publishing_year__lte=max_year)
-
-    # --- Yearly paper count ---
-    data = Papers.objects.values('publishing_year').annotate(total=Count('doi')).order_by('publishing_year')
-    labels = [d['publishing_year'] for d in data]
-    values = [d['total'] for d in data]
-    
-    total_papers = sum(values)
-    avg_papers = total_papers // len(values) if values else 0
-    
-    current_year = timezone.now().year
-    papers_this_year = Papers.objects.filter(publishing_year=current_year).count()
+def cached_chart(kind, min_year, max_year, epoch, render_chart):
+    """Returns the cached chart (PNG or series data) for (kind, min_year, max_year, epoch), building it only on a miss."""
+    global _chart_cache_epoch
+    if epoch != _chart_cache_epoch:
+        # The data changed since the last render: evict every chart of the old epoch
+        CHART_CACHE.clear()
+        _chart_cache_epoch = epoch
+
+    key = f"chart:{kind}:{min_year}:{max_year}:{epoch}"
+    chart = CHART_CACHE.get(key)
+    if chart is None:
+        chart = render_chart()
+        CHART_CACHE.set(key, chart)
+    return chart
+
+def _figure_to_base64():
+    # Save to a BytesIO buffer instead of a file
+    buffer = BytesIO()
+    plt.savefig(buffer, format='png')
+    plt.close()
+    buffer.seek(0)
+    return base64.b64encode(buffer.getvalue()).decode('utf-8')
 
-    # --- Chart generation ---
+def _render_yearly_chart(labels, values):
     plt.figure(figsize=(8, 5))
     plt.plot(labels, values, marker='o', linestyle='-', color='g')
     plt.title("Publications per Year")
@@ -58,71 +61,16 @@ def DomainAnalysis(request):
     plt.ylabel("Number of Papers")
     plt.grid(True)
     plt.tight_layout()
+    return _figure_to_base64()
 
-    # Save to a BytesIO buffer instead of a file
-    buffer = BytesIO()
-    plt.savefig(buffer, format='png')
-    plt.close()
-    buffer.seek(0)
-
-    image_base64 = base64.b64encode(buffer.getvalue()).decode('utf-8')
-    
-    keyword_to_papers = defaultdict(list)
-    all_kp = Keywords_Paper.objects.select_related('keyword_id', 'doi').all()
-    for kp in all_kp:
-        keyword_to_papers[kp.keyword_id.id].append(kp.doi)  
-        
-    topic_total_count = Counter()
-    topic_yearly_count = defaultdict(lambda: Counter())
-    for keyword_id, papers_list in keyword_to_papers.items():
-        for paper in papers_list:
-            if min_year <= paper.publishing_year <= max_year:
-                topic_total_count[keyword_id] += 1
-                topic_yearly_count[keyword_id][paper.publishing_year] += 1
-
-    keyword_id_to_name = {k.id: k.keyword for k in Keywords.objects.filter(id__in=topic_total_count.keys())}
-
-    # --- Top N topics for pie chart and list ---
-    top_n = 10
-    top_keywords = topic_total_count.most_common(top_n)
-    top_keywords_names = [(keyword_id_to_name[k[0]], k[1]) for k in top_keywords]
-
-    # --- Pie chart ---
-    labels = [t[0] for t in top_keywords_names]
-    counts = [t[1] for t in top_keywords_names]
-    total_papers_in_range = sum(topic_total_count.values())
-    other_count = max(total_papers_in_range - sum(counts), 0)
-    if other_count > 0:
-        labels.append("Other")
-        counts.append(other_count)
-
+def _render_pie_chart(labels, counts, top_count):
     plt.figure(figsize=(6, 6))
     plt.pie(counts, labels=labels, autopct='%1.1f%%', startangle=140)
-    plt.title(f"Top {len(top_keywords_names)} Topics Distribution")
+    plt.title(f"Top {top_count} Topics Distribution")
     plt.tight_layout()
-    buffer = BytesIO()
-    plt.savefig(buffer, format='png')
-    plt.close()
-    buffer.seek(0)
-    pie_chart_base64 = base64.b64encode(buffer.getvalue()).decode('utf-8')
-
-    # --- Determine top 10 topics in max_year for trend lines ---
-    topic_count_max_year = {k: v.get(max_year, 0) for k, v in topic_yearly_count.items()}
-    top_10_keyword_ids_max_year = sorted(topic_count_max_year, key=topic_count_max_year.get, reverse=True)[:10]
-
-    # --- Prepare cumulative trend data for top 10 in max_year ---
-    all_years = list(range(min_year, max_year + 1))
-    top_topic_trends = {}
-    for keyword_id in top_10_keyword_ids_max_year:
-        cumulative = 0
-        yearly_counts = []
-        for year in all_years:
-            count = topic_yearly_count[keyword_id].get(year, 0)
-            cumulative += count
-            yearly_counts.append(cumulative)
-        top_topic_trends[keyword_id_to_name[keyword_id]] = yearly_counts
-
-    # --- Plot cumulative trend lines ---
+    return _figure_to_base64()
+
+def _render_trend_chart(all_years, top_topic_trends, min_year, max_year):
     plt.figure(figsize=(10, 6))
 
     for topic, cumulative_counts in top_topic_trends.items():
@@ -141,28 +89,125 @@ def DomainAnalysis(request):
     plt.grid(True)
     plt.legend(loc='best', fontsize='small')
     plt.tight_layout()
+    return _figure_to_base64()
+
+def _year_range(request, year_rows):
+    """
+    (min_year, max_year) of the request, clamped to the years that have papers; (None, None) without any.
+    Raises ValueError for a non-integer or inverted range.
+    """
+    # --- Read search range from query parameters ---
+    min_year = int(request.GET["min_year"]) if request.GET.get("min_year") else None
+    max_year = int(request.GET["max_year"]) if request.GET.get("max_year") else None
+    if min_year is not None and max_year is not None and min_year > max_year:
+        raise ValueError("min_year must not be after max_year")
+    if not year_rows:
+        return None, None
+
+    # Years outside the data add only empty columns, so the range never grows past it
+    first_year, last_year = year_rows[0][0], year_rows[-1][0]
+    min_year = first_year if min_year is None else min(max(min_year, first_year), last_year)
+    max_year = last_year if max_year is None else min(max(max_year, first_year), last_year)
+    return min_year, max_year
+
+def DashboardSeries(year_rows, min_year, max_year):
+    """Builds the chart data of the home page: yearly counts, top-topic shares and cumulative trends."""
+    top_n = 10
+    all_years = list(range(min_year, max_year + 1)) if min_year is not None and max_year is not None else []
 
-    buffer = BytesIO()
-    plt.savefig(buffer, format='png')
-    plt.close()
-    buffer.seek(0)
-    topics_trend_base64 = base64.b64encode(buffer.getvalue()).decode('utf-8')
+    top_keywords_names, trend_topics, cumulative, total_papers_in_range = [], [], [], 0
+    if all_years:
+        # Only the rows of the top topics, ranked in SQL, reach the matrix
+        matrix = analytics_utils.TopicMatrix.from_rollup(min_year, max_year, top_n)
+
+        # --- Top N topics for pie chart and list ---
+        top_rows, top_counts = matrix.top_n(top_n, min_year, max_year)
+        top_keywords_names = list(zip(matrix.keyword_names(top_rows), top_counts.tolist()))
+        total_papers_in_range = matrix.range_total
+
+        # --- Cumulative trends of the top 10 topics in max_year ---
+        trend_rows = matrix.trending(max_year, top_n)
+        trend_topics = matrix.keyword_names(trend_rows)
+        cumulative = matrix.cumulative(trend_rows, min_year, max_year).tolist()
+
+    # --- Pie chart ---
+    labels = [t[0] for t in top_keywords_names]
+    counts = [t[1] for t in top_keywords_names]
+    other_count = max(total_papers_in_range - sum(counts), 0)
+    if other_count > 0:
+        labels.append("Other")
+        counts.append(other_count)
+
+    return {
+        'min_year': min_year,
+        'max_year': max_year,
+        'yearly': {'years': [year for year, _ in year_rows], 'counts': [count for _, count in year_rows]},
+        'topics': {'labels': labels, 'counts': counts},
+        'trends': {'years': all_years, 'topics': trend_topics, 'cumulative': cumulative},
+        'top_topics': top_keywords_names,
+    }
+
+def DomainAnalysis(request):
+
+    # --- Per-year paper counts come from the rollup table (one row per year) ---
+    year_rows = list(Papers_Year.objects.filter(paper_count__gt=0).order_by('publishing_year').values_list('publishing_year', 'paper_count'))
+    try:
+        min_year, max_year = _year_range(request, year_rows)
+    except ValueError:
+        return HttpResponseBadRequest("min_year and max_year must be integers, min_year <= max_year.")
+
+    # --- Yearly paper count ---
+    values = [count for _, count in year_rows]
+
+    total_papers = sum(values)
+    avg_papers = total_papers // len(values) if values else 0
+
+    current_year = timezone.now().year
+    papers_this_year = dict(year_rows).get(current_year, 0)
+
+    # --- Chart data (cached per epoch; charts are drawn in the browser) ---
+    epoch = analytics_utils.served_epoch(rollup_utils.current_epoch())  # rate-limited while scrapers ingest
+    series = cached_chart("series", min_year, max_year, epoch, lambda: DashboardSeries(year_rows, min_year, max_year))
 
-    # --- 8. Render template ---
     context = {
-        'chart': image_base64,
-        'topics_trend_chart': topics_trend_base64,
-        'topics_pie_chart': pie_chart_base64,
+        'series': series,
         'avg_papers': avg_papers,
         'papers_this_year': papers_this_year,
         'total_papers': total_papers,
         'current_year': current_year,
         'latest_year': max_year,
-        'top_topics': top_keywords_names[:10],
+        'top_topics': series['top_topics'][:10],
         'min_year': min_year,
         'max_year': max_year,
     }
-    
+
+    # --- Server-side PNGs, only for clients that ask for them (?charts=png) ---
+    if request.GET.get("charts") == "png":
+        trends = series['trends']
+        context['chart'] = cached_chart(
+            "yearly", None, None, epoch,
+            lambda: _render_yearly_chart(series['yearly']['years'], series['yearly']['counts']),
+        )
+        context['topics_pie_chart'] = cached_chart(
+            "pie", min_year, max_year, epoch,
+            lambda: _render_pie_chart(series['topics']['labels'], series['topics']['counts'], len(series['top_topics'])),
+        )
+        context['topics_trend_chart'] = cached_chart(
+            "trend", min_year, max_year, epoch,
+            lambda: _render_trend_chart(trends['years'], dict(zip(trends['topics'], trends['cumulative'])), min_year, max_year),
+        )
+
     return render(request, 'index.html', context)
 
+def DashboardSeriesApi(request):
+    """JSON version of the home page charts: /api/dashboard/series?min_year=&max_year="""
+    year_rows = list(Papers_Year.objects.filter(paper_count__gt=0).order_by('publishing_year').values_list('publishing_year', 'paper_count'))
+    try:
+        min_year, max_year = _year_range(request, year_rows)
+    except ValueError:
+        return JsonResponse({'error': 'min_year and max_year must be integers, min_year <= max_year'}, status=400)
 
+    epoch = analytics_utils.served_epoch(rollup_utils.current_epoch())  # rate-limited while scrapers ingest
+    series = cached_chart("series", min_year, max_year, epoch, lambda: DashboardSeries(year_rows, min_year, max_year))
+    payload = {key: value for key, value in series.items() if key != 'top_topics'}
+    return JsonResponse(payload, json_dumps_params={'separators': (',', ':')})
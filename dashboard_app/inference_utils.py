@@ -0,0 +1,146 @@
+import asyncio
+import json
+import os
+import socket
+import struct
+from django.conf import settings
+from . import summarize_utils
+
+
+# Requests arriving within this window of the first one share a batch
+BATCH_WINDOW = 0.005
+MAX_BATCH = 16
+
+# Messages are a 4-byte big-endian length followed by UTF-8 JSON
+_HEADER = struct.Struct("!I")
+
+
+def _encode(payload):
+    data = json.dumps(payload).encode("utf-8")
+    return _HEADER.pack(len(data)) + data
+
+
+def _recv_exactly(sock, size):
+    data = b""
+    while len(data) < size:
+        chunk = sock.recv(size - len(data))
+        if not chunk:
+            raise ConnectionError("inference server closed the connection")
+        data += chunk
+    return data
+
+
+# --- Server side ---
+class MicroBatcher:
+    """
+    Gathers concurrent summary requests for a few milliseconds and runs them as padded
+    batches on the one model copy, then fans the results back out to each caller.
+    While a batch runs, new requests queue up and form the next (larger) batch.
+    """
+
+    def __init__(self, summarize_batch=None, window=BATCH_WINDOW, max_batch=MAX_BATCH):
+        self.summarize_batch = summarize_batch or summarize_utils.summarize_batch
+        self.window = window
+        self.max_batch = max_batch
+        self.queue = asyncio.Queue()
+
+    async def submit(self, text, min_percent=30, max_percent=60):
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((text, summarize_utils.normalise_percents(min_percent, max_percent), future))
+        return await future
+
+    async def _collect(self):
+        loop = asyncio.get_running_loop()
+        items = [await self.queue.get()]
+        deadline = loop.time() + self.window
+        while len(items) < self.max_batch:
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                items.append(await asyncio.wait_for(self.queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return items
+
+    async def _run_batch(self, items):
+        # One generate call per length setting; similar lengths side by side keep padding low
+        groups = {}
+        for item in items:
+            groups.setdefault(item[1], []).append(item)
+
+        loop = asyncio.get_running_loop()
+        for (min_percent, max_percent), group in groups.items():
+            group.sort(key=lambda item: len(item[0]))
+            try:
+                results = await loop.run_in_executor(
+                    None, self.summarize_batch, [text for text, _, _ in group], min_percent, max_percent
+                )
+            except Exception as e:
+                for _, _, future in group:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            for (_, _, future), result in zip(group, results):
+                if not future.done():
+                    future.set_result(result)
+
+    async def run(self):
+        while True:
+            await self._run_batch(await self._collect())
+
+
+async def _handle(reader, writer, batcher):
+    try:
+        (size,) = _HEADER.unpack(await reader.readexactly(_HEADER.size))
+        request = json.loads(await reader.readexactly(size))
+        summary, source = await batcher.submit(request["text"], request.get("min_percent", 30), request.get("max_percent", 60))
+        writer.write(_encode({"summary": summary, "source": source}))
+    except asyncio.IncompleteReadError:
+        pass  # client went away
+    except Exception as e:
+        writer.write(_encode({"error": str(e)}))
+    finally:
+        try:
+            await writer.drain()
+        finally:
+            writer.close()
+
+
+async def serve(path, batcher=None):
+    """Serves summaries on a Unix socket until cancelled."""
+    batcher = batcher or MicroBatcher()
+    if os.path.exists(path):
+        os.unlink(path)
+    server = await asyncio.start_unix_server(lambda reader, writer: _handle(reader, writer, batcher), path=path)
+    os.chmod(path, 0o660)
+    async with server:
+        await asyncio.gather(server.serve_forever(), batcher.run())
+
+
+# --- Client side ---
+def summarize(text, min_percent=30, max_percent=60, timeout=None):
+    """
+    Returns (summary, source) like summarize_utils.summarize_with_source.
+    Uses the inference server when SUMMARY_SERVER_SOCKET is set (in-process model otherwise);
+    an unreachable or slow server degrades to the TF-IDF summary instead of an error.
+    """
+    path = settings.SUMMARY_SERVER_SOCKET
+    txt = summarize_utils.clean_text(text)
+    if not path or len(txt.split()) < 20:
+        return summarize_utils.summarize_with_source(txt, min_percent, max_percent)
+
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.settimeout(timeout or settings.SUMMARY_SERVER_TIMEOUT)
+            sock.connect(path)
+            sock.sendall(_encode({"text": txt, "min_percent": min_percent, "max_percent": max_percent}))
+            (size,) = _HEADER.unpack(_recv_exactly(sock, _HEADER.size))
+            response = json.loads(_recv_exactly(sock, size))
+        if "error" in response:
+            raise ValueError(response["error"])
+        return response["summary"], response["source"]
+    except (OSError, ValueError, KeyError) as e:
+        print(f"[WARN] Inference server unavailable ({e}); using TF-IDF summary.")
+        min_percent, max_percent = summarize_utils.normalise_percents(min_percent, max_percent)
+        return summarize_utils._tfidf_fallback(txt, min_percent, max_percent), "fallback"
@@ -0,0 +1,87 @@
+from django.core.management.base import BaseCommand
+from dashboard_app.models import Papers
+from dashboard_app import summarize_utils, model_utils
+from datetime import datetime
+from collections import Counter
+import multiprocessing
+import time
+import torch
+
+
+def _overlap(reference, candidate):
+    """Unigram F1 between two summaries (ROUGE-1 style)."""
+    reference, candidate = Counter(reference.lower().split()), Counter(candidate.lower().split())
+    common = sum((reference & candidate).values())
+    if not common:
+        return 0.0
+    precision, recall = common / sum(candidate.values()), common / sum(reference.values())
+    return 2 * precision * recall / (precision + recall)
+
+
+def _run_backend(backend, warm_up, texts, min_percent, max_percent):
+    # Runs in a fresh forked process so each backend's memory is measured on its own
+    rss_before = model_utils.rss_mb()
+    summarize_utils.tokenizer = summarize_utils.AutoTokenizer.from_pretrained(summarize_utils.model_name)
+    summarize_utils.SUMMARIZER = summarize_utils.load_summarizer(backend)
+    rss_model = model_utils.rss_mb() - rss_before
+
+    summarize_utils.summarize_with_source(warm_up, min_percent, max_percent)  # not one of the timed texts
+    latencies, summaries, sources = [], [], []
+    for text in texts:
+        summarize_utils.ENCODER_CACHE.clear()  # every sample pays for its encoder run
+        torch.manual_seed(0)
+        start = time.perf_counter()
+        summary, source = summarize_utils.summarize_with_source(text, min_percent, max_percent)
+        latencies.append(time.perf_counter() - start)
+        summaries.append(summary)
+        sources.append(source)
+    return {"rss_model": rss_model, "rss_total": model_utils.rss_mb(), "latencies": latencies,
+            "summaries": summaries, "sources": sources}
+
+
+class Command(BaseCommand):
+    help = "Compare summarizer backends (latency, memory, summary overlap with fp32) on abstracts from the database."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--backends", default="fp32,int8", help=f"Comma-separated, from {summarize_utils.BACKENDS}; fp32 is always the baseline.")
+        parser.add_argument("--samples", type=int, default=20)
+        parser.add_argument("--min_percent", type=int, default=30)
+        parser.add_argument("--max_percent", type=int, default=60)
+
+    def handle(self, *args, **options):
+        backends = ["fp32"] + [b for b in options["backends"].split(",") if b and b != "fp32"]
+        texts = [
+            abstract for abstract in
+            Papers.objects.exclude(abstract__isnull=True).exclude(abstract="").order_by("?").values_list("abstract", flat=True)[:options["samples"] * 3]
+            if len(summarize_utils.clean_text(abstract).split()) >= 20
+        ][:options["samples"] + 1]
+        if len(texts) < 2:
+            print("No abstracts to benchmark.")
+            return
+        warm_up, texts = texts[0], texts[1:]
+
+        print(f"\n=== Summarizer Benchmark: {len(texts)} abstracts, {datetime.now().strftime('%Y-%m-%d %H:%M:%S')} ===\n")
+        context = multiprocessing.get_context("fork")
+        results = {}
+        for backend in backends:
+            with context.Pool(1) as pool:
+                results[backend] = pool.apply(_run_backend, (backend, warm_up, texts, options["min_percent"], options["max_percent"]))
+
+        # Only samples every backend summarized with its model are compared: a TF-IDF fallback
+        # would count as a fast, low-overlap sample of whichever backend failed
+        baseline = results["fp32"]
+        compared = [i for i in range(len(texts)) if all(result["sources"][i] == "model" for result in results.values())]
+        if not compared:
+            print("No abstract was summarized by the model on every backend.")
+            return
+
+        print(f"{'backend':<8} {'model':>7} {'model MB':>9} {'RSS MB':>8} {'mean s':>8} {'p95 s':>8} {'speedup':>8} {'overlap':>8}")
+        for backend, result in results.items():
+            modelled = f"{result['sources'].count('model')}/{len(texts)}"
+            latencies = sorted(result["latencies"][i] for i in compared)
+            mean = sum(latencies) / len(latencies)
+            p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+            speedup = (sum(baseline["latencies"][i] for i in compared) / len(latencies)) / mean
+            overlap = sum(_overlap(baseline["summaries"][i], result["summaries"][i]) for i in compared) / len(compared)
+            print(f"{backend:<8} {modelled:>7} {result['rss_model']:>9.0f} {result['rss_total']:>8.0f} {mean:>8.2f} {p95:>8.2f} {speedup:>7.2f}x {overlap:>8.2f}")
+        print(f"\nLatency and overlap over the {len(compared)} abstracts every backend summarized with its model.\n")
@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+from dashboard_app.models import Papers
+from dashboard_app import embedding_utils
+from datetime import datetime
+
+
+class Command(BaseCommand):
+    help = "Compute the semantic-search embedding of papers that do not have one yet."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch_size", type=int, default=256)
+        parser.add_argument("--all", action="store_true", help="Re-embed every paper, not only missing ones.")
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        print(f"\n=== Paper Embedding Started: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')} ===\n")
+
+        papers = Papers.objects.only("doi", "title", "abstract").order_by("doi")
+        if not options["all"]:
+            papers = papers.exclude(paper_embedding__model_name=embedding_utils.EMBEDDING_MODEL)
+
+        # Walk the primary key so memory stays flat and the encoder sees full batches
+        last_doi, embedded = "", 0
+        while True:
+            batch = list(papers.filter(doi__gt=last_doi)[:batch_size])
+            if not batch:
+                break
+            embedded += embedding_utils.store_embeddings(batch)
+            last_doi = batch[-1].doi
+            print(f" Embedded {embedded} papers (last DOI: {last_doi})")
+
+        print(f"\n=== Paper Embedding Finished: {embedded} papers, {datetime.now().strftime('%Y-%m-%d %H:%M:%S')} ===\n")
@@ -0,0 +1,45 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Exists, OuterRef
+from dashboard_app.models import Papers, Keywords_Paper
+from dashboard_app.Keyword_extraction import KeywordExtractor, link_keywords
+from datetime import datetime
+import time
+
+
+class Command(BaseCommand):
+    help = "Extract and link keywords for papers that have an abstract but no keywords, in batched KeyBERT calls."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch_size", type=int, default=64, help="Abstracts per extraction batch.")
+        parser.add_argument("--top_n", type=int, default=5, help="Keywords per paper.")
+        parser.add_argument("--limit", type=int, default=None, help="Stop after this many papers.")
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        extractor = KeywordExtractor(top_n=options["top_n"])
+        print(f"\n=== Keyword Extraction Started: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')} ===\n")
+
+        papers = (
+            Papers.objects.exclude(abstract__isnull=True)
+            .exclude(abstract="")
+            .exclude(Exists(Keywords_Paper.objects.filter(doi=OuterRef("doi"))))
+            .only("doi", "title", "abstract", "publishing_year")
+            .order_by("doi")
+        )
+
+        # Walk the primary key so memory stays flat and KeyBERT sees full batches
+        last_doi, done, start = "", 0, time.perf_counter()
+        while options["limit"] is None or done < options["limit"]:
+            size = batch_size if options["limit"] is None else min(batch_size, options["limit"] - done)
+            batch = list(papers.filter(doi__gt=last_doi)[:size])
+            if not batch:
+                break
+
+            for paper, keywords in zip(batch, extractor.ExtractTopicsBatch([paper.abstract for paper in batch], batch_size)):
+                link_keywords(paper, keywords)
+
+            done += len(batch)
+            last_doi = batch[-1].doi
+            print(f" Extracted keywords for {done} papers ({done / (time.perf_counter() - start):.1f} papers/s, last DOI: {last_doi})")
+
+        print(f"\n=== Keyword Extraction Finished: {done} papers, {datetime.now().strftime('%Y-%m-%d %H:%M:%S')} ===\n")
@@ -0,0 +1,32 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from dashboard_app.models import Papers
+from dashboard_app import summarize_utils
+from datetime import datetime
+import os
+
+
+class Command(BaseCommand):
+    help = "Fit the corpus IDF used by the TF-IDF fallback summarizer over every paper abstract."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--output", default=None, help="Artifact path (default: SUMMARY_IDF_PATH).")
+
+    def handle(self, *args, **options):
+        output = str(options["output"] or settings.SUMMARY_IDF_PATH)
+        print(f"\n=== IDF Fit Started: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')} ===\n")
+
+        abstracts = (
+            Papers.objects.exclude(abstract__isnull=True)
+            .exclude(abstract="")
+            .values_list("abstract", flat=True)
+            .iterator(chunk_size=2000)
+        )
+        idf, documents = summarize_utils.fit_idf(abstracts)
+        summarize_utils.save_idf(idf, output)
+        summarize_utils.reset_corpus_idf()
+
+        size_mb = os.path.getsize(output) / (1024 * 1024)
+        print(f" Fitted IDF over {documents} abstracts -> {output} ({size_mb:.1f} MB)")
+        print(" Running workers load it on restart.")
+        print(f"\n=== IDF Fit Finished: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')} ===\n")
@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from dashboard_app.models import Papers
+from dashboard_app.search_utils import PAPER_SEARCH_VECTOR
+from datetime import datetime
+
+
+class Command(BaseCommand):
+    help = "Recompute Papers.search_vector in batches and rebuild its GIN index."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch_size", type=int, default=2000)
+        parser.add_argument("--missing_only", action="store_true", help="Only fill papers without a search vector.")
+        parser.add_argument("--no_reindex", action="store_true", help="Skip REINDEX of the GIN index.")
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        print(f"\n=== Search Index Rebuild Started: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')} ===\n")
+
+        papers = Papers.objects.order_by("doi")
+        if options["missing_only"]:
+            papers = papers.filter(search_vector__isnull=True)
+
+        # Walk the primary key so each batch is a short transaction and memory stays flat
+        last_doi, updated = "", 0
+        while True:
+            batch = list(papers.filter(doi__gt=last_doi).values_list("doi", flat=True)[:batch_size])
+            if not batch:
+                break
+            with transaction.atomic():
+                updated += Papers.objects.filter(doi__in=batch).update(search_vector=PAPER_SEARCH_VECTOR)
+            last_doi = batch[-1]
+            print(f" Indexed {updated} papers (last DOI: {last_doi})")
+
+        if not options["no_reindex"]:
+            with connection.cursor() as cursor:
+                cursor.execute("REINDEX INDEX papers_search_vector_gin")
+            print(" Rebuilt GIN index papers_search_vector_gin")
+
+        print(f"\n=== Search Index Rebuild Finished: {updated} papers, {datetime.now().strftime('%Y-%m-%d %H:%M:%S')} ===\n")
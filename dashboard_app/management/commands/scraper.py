@@ -1,5 +1,6 @@
 from django.core.management.base import BaseCommand
 from dashboard_app.models import Papers, Authors, Author_Papers, Keywords
+from dashboard_app import rollup_utils, embedding_utils
 import requests
 from datetime import datetime
 import time
@@ -206,6 +207,7 @@ class Command(BaseCommand):
                     print(f"No results for '{term}'")
                     continue
 
+                page_papers = []  # embedded together once the page is saved
                 for item in items:
                     if not is_cs_related(item):
                         print(f" Skipped non-CS paper: {item.get('title', ['N/A'])[0]}")
@@ -230,7 +232,7 @@ class Command(BaseCommand):
                     paper_type = item.get("type", "unknown")
 
                     if not Papers.objects.filter(doi=doi).exists():
-                        Papers.objects.create(
+                        paper = Papers.objects.create(
                             doi=doi,
                             title=title,
                             publishing_year=year,
@@ -239,6 +241,8 @@ class Command(BaseCommand):
                             link=link,
                             paper_type=paper_type
                         )
+                        rollup_utils.record_papers([year])
+                        page_papers.append(paper)
                         new_papers.append(title)
                         print(f" Saved paper: {title}")
                     else:
@@ -273,6 +277,12 @@ class Command(BaseCommand):
                             pending_keywords.append(added)
                             new_keywords_this_run += 1
 
+                # One encode and one epoch bump per page instead of per paper
+                try:
+                    embedding_utils.store_embeddings(page_papers)
+                except Exception as e:
+                    print(f"[WARN] Embedding {len(page_papers)} papers failed, left for embed_papers to backfill: {e}")
+
                 time.sleep(1)
 
             except Exception as e:
@@ -0,0 +1,109 @@
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.db.models import Exists, OuterRef
+from dashboard_app.models import Papers, Paper_Summary
+from dashboard_app import summarize_utils
+from datetime import datetime
+from itertools import islice
+import multiprocessing
+import os
+import torch
+
+
+DEFAULT_CHECKPOINT = os.path.join(os.path.dirname(__file__), "..", "..", "logs", "summarize_corpus.checkpoint")
+
+
+def _init_worker(torch_threads):
+    # Each worker process gets a bounded share of the cores instead of all of them
+    torch.set_num_threads(torch_threads)
+
+
+def _length_sorted_batches(rows, batch_size):
+    """Groups (doi, abstract) rows by abstract length so each padded batch wastes little compute."""
+    rows = sorted(rows, key=lambda row: len(row[1]))
+    return [rows[i:i + batch_size] for i in range(0, len(rows), batch_size)]
+
+
+class Command(BaseCommand):
+    help = "Precompute summaries for every paper with an abstract, in batched generate calls across worker processes."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch_size", type=int, default=8, help="Abstracts per generate call.")
+        parser.add_argument("--workers", type=int, default=2, help="Worker processes (1 = run in this process).")
+        parser.add_argument("--torch_threads", type=int, default=2, help="Torch threads per worker process.")
+        parser.add_argument("--chunk_size", type=int, default=256, help="Papers read, summarized and checkpointed together.")
+        parser.add_argument("--min_percent", type=int, default=30)
+        parser.add_argument("--max_percent", type=int, default=60)
+        parser.add_argument("--checkpoint", default=DEFAULT_CHECKPOINT, help="File holding the last finished DOI.")
+        parser.add_argument("--restart", action="store_true", help="Ignore the checkpoint and start from the first DOI.")
+
+    def handle(self, *args, **options):
+        min_percent, max_percent = summarize_utils.normalise_percents(options["min_percent"], options["max_percent"])
+        model_id = summarize_utils.model_id()
+        checkpoint = options["checkpoint"]
+        print(f"\n=== Corpus Summarization Started: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')} ===\n")
+
+        last_doi = ""
+        if not options["restart"] and os.path.exists(checkpoint):
+            with open(checkpoint) as f:
+                last_doi = f.read().strip()
+            print(f" Resuming after DOI {last_doi}")
+
+        summarized = Paper_Summary.objects.filter(
+            doi=OuterRef("doi"), min_percent=min_percent, max_percent=max_percent, model_id=model_id
+        )
+        papers = (
+            Papers.objects.filter(doi__gt=last_doi)
+            .exclude(abstract__isnull=True)
+            .exclude(abstract="")
+            .exclude(Exists(summarized))
+            .order_by("doi")
+            .values_list("doi", "abstract")
+        )
+
+        # Fork the workers before the cursor opens: they only run the model and never touch the database
+        pool = None
+        if options["workers"] > 1:
+            summarize_utils._get_summarizer()  # load once so the forked workers share its memory
+            connection.close()
+            pool = multiprocessing.get_context("fork").Pool(
+                options["workers"], initializer=_init_worker, initargs=(options["torch_threads"],)
+            )
+        else:
+            _init_worker(options["torch_threads"])
+
+        done, stored = 0, 0
+        rows = papers.iterator(chunk_size=options["chunk_size"])  # server-side cursor
+        try:
+            while True:
+                chunk = list(islice(rows, options["chunk_size"]))
+                if not chunk:
+                    break
+
+                batches = _length_sorted_batches(chunk, options["batch_size"])
+                jobs = [([abstract for _, abstract in batch], min_percent, max_percent) for batch in batches]
+                if pool:
+                    results = pool.starmap(summarize_utils.summarize_batch, jobs)
+                else:
+                    results = [summarize_utils.summarize_batch(*job) for job in jobs]
+
+                # Only model output is stored, same as the paper page
+                summaries = [
+                    Paper_Summary(doi_id=doi, min_percent=min_percent, max_percent=max_percent, model_id=model_id, summary=summary)
+                    for batch, batch_results in zip(batches, results)
+                    for (doi, _), (summary, source) in zip(batch, batch_results)
+                    if source == "model"
+                ]
+                Paper_Summary.objects.bulk_create(summaries, ignore_conflicts=True)
+
+                done += len(chunk)
+                stored += len(summaries)
+                with open(checkpoint, "w") as f:
+                    f.write(chunk[-1][0])
+                print(f" Summarized {done} papers, stored {stored} (last DOI: {chunk[-1][0]})")
+        finally:
+            if pool:
+                pool.close()
+                pool.join()
+
+        print(f"\n=== Corpus Summarization Finished: {stored} summaries stored, {datetime.now().strftime('%Y-%m-%d %H:%M:%S')} ===\n")
@@ -0,0 +1,29 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from dashboard_app import inference_utils, summarize_utils
+from datetime import datetime
+import asyncio
+import torch
+
+
+class Command(BaseCommand):
+    help = "Run the DistilBART inference server: one model copy serving micro-batched summaries on a Unix socket."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--socket", default=settings.SUMMARY_SERVER_SOCKET or "/tmp/dashboard-summarizer.sock")
+        parser.add_argument("--window_ms", type=float, default=inference_utils.BATCH_WINDOW * 1000, help="How long to gather requests into a batch.")
+        parser.add_argument("--max_batch", type=int, default=inference_utils.MAX_BATCH)
+        parser.add_argument("--torch_threads", type=int, default=0, help="Torch threads (0 = torch default).")
+
+    def handle(self, *args, **options):
+        if options["torch_threads"]:
+            torch.set_num_threads(options["torch_threads"])
+
+        summarize_utils._get_summarizer()  # load before accepting requests
+        print(f"\n=== Summary Server Started on {options['socket']}: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')} ===\n")
+
+        batcher = inference_utils.MicroBatcher(window=options["window_ms"] / 1000, max_batch=options["max_batch"])
+        try:
+            asyncio.run(inference_utils.serve(options["socket"], batcher))
+        except KeyboardInterrupt:
+            print(f"\n=== Summary Server Stopped: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')} ===\n")
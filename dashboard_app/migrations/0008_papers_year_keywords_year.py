@@ -0,0 +1,55 @@
+# Generated by Django 5.1.2 on 2026-10-17 20:34
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def populate_rollups(apps, schema_editor):
+    Papers = apps.get_model('dashboard_app', 'Papers')
+    Keywords_Paper = apps.get_model('dashboard_app', 'Keywords_Paper')
+    Papers_Year = apps.get_model('dashboard_app', 'Papers_Year')
+    Keywords_Year = apps.get_model('dashboard_app', 'Keywords_Year')
+
+    Papers_Year.objects.bulk_create(
+        Papers_Year(publishing_year=row['publishing_year'], paper_count=row['total'])
+        for row in Papers.objects.values('publishing_year').annotate(total=Count('doi')).order_by()
+    )
+    Keywords_Year.objects.bulk_create(
+        (
+            Keywords_Year(keyword_id_id=row['keyword_id'], publishing_year=row['doi__publishing_year'], paper_count=row['total'])
+            for row in Keywords_Paper.objects.values('keyword_id', 'doi__publishing_year').annotate(total=Count('id')).order_by()
+        ),
+        batch_size=5000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard_app', '0007_alter_author_papers_author_id_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Papers_Year',
+            fields=[
+                ('publishing_year', models.IntegerField(primary_key=True, serialize=False)),
+                ('paper_count', models.IntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Keywords_Year',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('publishing_year', models.IntegerField()),
+                ('paper_count', models.IntegerField(default=0)),
+                ('keyword_id', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='dashboard_app.keywords')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['publishing_year'], name='dashboard_a_publish_99b9d9_idx')],
+                'unique_together': {('keyword_id', 'publishing_year')},
+            },
+        ),
+        migrations.RunPython(populate_rollups, migrations.RunPython.noop),
+    ]
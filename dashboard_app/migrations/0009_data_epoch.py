@@ -0,0 +1,20 @@
+# Generated by Django 5.1.2 on 2026-10-17 20:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard_app', '0008_papers_year_keywords_year'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Data_Epoch',
+            fields=[
+                ('name', models.CharField(max_length=50, primary_key=True, serialize=False)),
+                ('epoch', models.BigIntegerField(default=0)),
+            ],
+        ),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 5.1.2 on 2026-10-17 20:42
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.db import migrations
+
+
+# Keeps Papers.search_vector current for every write path (save, bulk_create, raw SQL)
+CREATE_TRIGGER = """
+CREATE OR REPLACE FUNCTION dashboard_app_papers_search_vector() RETURNS trigger AS $$
+BEGIN
+    NEW.search_vector :=
+        setweight(to_tsvector('english'::regconfig, COALESCE(NEW.title, '')), 'A') ||
+        setweight(to_tsvector('english'::regconfig, COALESCE(NEW.abstract, '')), 'B');
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER papers_search_vector_update
+    BEFORE INSERT OR UPDATE OF title, abstract ON dashboard_app_papers
+    FOR EACH ROW EXECUTE FUNCTION dashboard_app_papers_search_vector();
+
+UPDATE dashboard_app_papers SET title = title;
+"""
+
+DROP_TRIGGER = """
+DROP TRIGGER IF EXISTS papers_search_vector_update ON dashboard_app_papers;
+DROP FUNCTION IF EXISTS dashboard_app_papers_search_vector();
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard_app', '0009_data_epoch'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='papers',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunSQL(CREATE_TRIGGER, DROP_TRIGGER),
+        migrations.AddIndex(
+            model_name='papers',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='papers_search_vector_gin'),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.1.2 on 2026-10-17 20:44
+
+import django.contrib.postgres.indexes
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard_app', '0010_papers_search_vector'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AddIndex(
+            model_name='authors',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['name'], name='authors_name_trgm', opclasses=['gin_trgm_ops']),
+        ),
+        migrations.AddIndex(
+            model_name='authors',
+            index=models.Index(fields=['orcid'], name='authors_orcid_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='keywords',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['keyword'], name='keywords_keyword_trgm', opclasses=['gin_trgm_ops']),
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.1.2 on 2026-10-17 20:48
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard_app', '0011_trigram_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Paper_Embedding',
+            fields=[
+                ('doi', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, serialize=False, to='dashboard_app.papers')),
+                ('vector', models.BinaryField()),
+                ('model_name', models.CharField(max_length=100)),
+            ],
+        ),
+    ]
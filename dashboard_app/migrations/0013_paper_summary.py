@@ -0,0 +1,29 @@
+# Generated by Django 5.1.2 on 2026-10-17 20:55
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard_app', '0012_paper_embedding'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Paper_Summary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('min_percent', models.IntegerField()),
+                ('max_percent', models.IntegerField()),
+                ('model_id', models.CharField(max_length=100)),
+                ('summary', models.TextField()),
+                ('created', models.DateTimeField(auto_now_add=True)),
+                ('doi', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='dashboard_app.papers')),
+            ],
+            options={
+                'unique_together': {('doi', 'min_percent', 'max_percent', 'model_id')},
+            },
+        ),
+    ]
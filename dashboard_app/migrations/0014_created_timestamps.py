@@ -0,0 +1,29 @@
+# Generated by Django 5.1.2 on 2026-10-17 21:48
+
+import django.db.models.functions.datetime
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard_app', '0013_paper_summary'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='authors',
+            name='created',
+            field=models.DateTimeField(db_default=django.db.models.functions.datetime.Now(), db_index=True, editable=False),
+        ),
+        migrations.AddField(
+            model_name='keywords',
+            name='created',
+            field=models.DateTimeField(db_default=django.db.models.functions.datetime.Now(), db_index=True, editable=False),
+        ),
+        migrations.AddField(
+            model_name='papers',
+            name='created',
+            field=models.DateTimeField(db_default=django.db.models.functions.datetime.Now(), db_index=True, editable=False),
+        ),
+    ]
@@ -0,0 +1,110 @@
+import resource
+import threading
+import time
+from django.conf import settings
+from django.http import JsonResponse
+
+
+# Sentence-transformer behind KeyBERT keyword extraction and semantic search embeddings
+KEYBERT_MODEL = "all-MiniLM-L6-v2"
+
+
+def rss_mb():
+    """Resident memory of this process in MB."""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # peak, in KB on Linux
+
+
+# --- Loaders ---
+def _load_keybert():
+    from keybert import KeyBERT
+    return KeyBERT(model=KEYBERT_MODEL)
+
+
+def _load_summarizer():
+    from . import summarize_utils
+    return summarize_utils.load_tokenizer_and_model()
+
+
+class ModelRegistry:
+    """
+    Loads each named model once per process, on first use (or at warm-up), and records how
+    long it took and how much resident memory it added. Loads of different models may run
+    concurrently; callers asking for a model that is loading wait for that load.
+    """
+
+    def __init__(self, loaders):
+        self._loaders = dict(loaders)
+        self._models = {}
+        self._stats = {}
+        self._locks = {name: threading.Lock() for name in self._loaders}
+
+    def get(self, name):
+        model = self._models.get(name)
+        if model is not None:
+            return model
+        if name not in self._loaders:
+            raise KeyError(f"unknown model {name!r}; registered: {sorted(self._loaders)}")
+
+        with self._locks[name]:
+            if name not in self._models:
+                rss_before, start = rss_mb(), time.perf_counter()
+                self._models[name] = self._loaders[name]()
+                self._stats[name] = {
+                    "seconds": round(time.perf_counter() - start, 3),
+                    "rss_mb": round(rss_mb() - rss_before, 1),
+                }
+                print(f"[MODEL] Loaded {name} in {self._stats[name]['seconds']}s (+{self._stats[name]['rss_mb']} MB RSS)")
+        return self._models[name]
+
+    def loaded(self, name):
+        return name in self._models
+
+    def stats(self):
+        return {name: {"loaded": name in self._models, **self._stats.get(name, {})} for name in self._loaders}
+
+    def clear(self, name=None):
+        """Forgets loaded models (all, or one) so the next get() loads again."""
+        for key in ([name] if name else list(self._models)):
+            self._models.pop(key, None)
+            self._stats.pop(key, None)
+
+
+REGISTRY = ModelRegistry({"keybert": _load_keybert, "summarizer": _load_summarizer})
+
+
+def get_model(name):
+    return REGISTRY.get(name)
+
+
+def warm_models(*names):
+    """Loads models before the first request or message (wsgi.py, Kafka consumers); defaults to WARM_MODELS."""
+    for name in names or settings.WARM_MODELS:
+        REGISTRY.get(name)
+
+
+def warm_models_in_background(*names):
+    """
+    warm_models() on a daemon thread, so a gunicorn worker answers its heartbeat (and requests
+    that need no model) while the models load; a request needing one waits for its load.
+    """
+    def warm():
+        try:
+            warm_models(*names)
+        except Exception as e:
+            print(f"[WARN] Model warm-up failed, loading on first use instead: {e}")
+
+    thread = threading.Thread(target=warm, name="model-warmup", daemon=True)
+    thread.start()
+    return thread
+
+
+def Model_Stats(request):
+    """Models loaded by this worker, with load time and memory: /api/models"""
+    return JsonResponse({"models": REGISTRY.stats(), "rss_mb": round(rss_mb(), 1)})
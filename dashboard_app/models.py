@@ -1,4 +1,7 @@
 from django.db import models
+from django.db.models.functions import Now
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from .const import Config
 
 
@@ -13,6 +16,14 @@ class Papers (models.Model):
     citations_count = models.IntegerField(null=False)
     link = models.URLField(max_length=2000,null=False, blank=False)
     paper_type = models.CharField(max_length=20, null=False, blank=False)
+
+    # Weighted title (A) + abstract (B) tsvector, filled by a database trigger on insert/update
+    search_vector = SearchVectorField(null=True, editable=False)
+    # Set by the database on insert (bulk and raw inserts too); the typeahead index refreshes from it
+    created = models.DateTimeField(db_default=Now(), editable=False, db_index=True)
+
+    class Meta:
+        indexes = [GinIndex(fields=["search_vector"], name="papers_search_vector_gin")]
     
     def paper_doi_link(self):
         if not Config.DOI_PREFIX:
@@ -27,6 +38,13 @@ class Authors(models.Model):
     id = models.CharField(max_length=20,null=False, unique=True, primary_key=True)
     name = models.CharField(max_length=150, blank=False, null=False)
     orcid = models.CharField(max_length=20, unique=False, null=True, blank=True)
+    created = models.DateTimeField(db_default=Now(), editable=False, db_index=True)
+
+    class Meta:
+        indexes = [
+            GinIndex(fields=["name"], name="authors_name_trgm", opclasses=["gin_trgm_ops"]),
+            models.Index(fields=["orcid"], name="authors_orcid_idx"),
+        ]
 
     
     
@@ -48,6 +66,10 @@ class Users(models.Model):
 class Keywords(models.Model):
     id = models.CharField(max_length=20, null=False, unique=True, primary_key=True)
     keyword = models.CharField(max_length=200, null=False, blank=False, unique=True)
+    created = models.DateTimeField(db_default=Now(), editable=False, db_index=True)
+
+    class Meta:
+        indexes = [GinIndex(fields=["keyword"], name="keywords_keyword_trgm", opclasses=["gin_trgm_ops"])]
     
     
 ##------------------Tables for junctions------------------------------##
@@ -74,4 +96,44 @@ class Keywords_Paper(models.Model):
     doi = models.ForeignKey(Papers, on_delete=models.CASCADE)
     class Meta:
         unique_together = ("doi", "keyword_id")
-    
+
+
+##------------------Rollup tables (kept up to date by rollup_utils)------------------##
+class Papers_Year(models.Model):
+    publishing_year = models.IntegerField(null=False, primary_key=True)
+    paper_count = models.IntegerField(null=False, default=0)
+
+
+class Keywords_Year(models.Model):
+    keyword_id = models.ForeignKey(Keywords, on_delete=models.CASCADE)
+    publishing_year = models.IntegerField(null=False)
+    paper_count = models.IntegerField(null=False, default=0)
+    class Meta:
+        unique_together = ("keyword_id", "publishing_year")
+        indexes = [models.Index(fields=["publishing_year"])]
+
+
+class Data_Epoch(models.Model):
+    name = models.CharField(max_length=50, null=False, primary_key=True)
+    epoch = models.BigIntegerField(null=False, default=0)
+
+
+##------------------Semantic search------------------------------##
+class Paper_Embedding(models.Model):
+    # all-MiniLM-L6-v2 embedding of title + abstract, L2-normalised float32 bytes (384 x 4 bytes)
+    doi = models.OneToOneField(Papers, on_delete=models.CASCADE, primary_key=True)
+    vector = models.BinaryField(null=False)
+    model_name = models.CharField(max_length=100, null=False, blank=False)
+
+
+##------------------Summaries------------------------------##
+class Paper_Summary(models.Model):
+    # One generated summary per (paper, length settings, model); filled by summary_utils
+    doi = models.ForeignKey(Papers, on_delete=models.CASCADE)
+    min_percent = models.IntegerField(null=False)
+    max_percent = models.IntegerField(null=False)
+    model_id = models.CharField(max_length=100, null=False, blank=False)
+    summary = models.TextField()
+    created = models.DateTimeField(auto_now_add=True)
+    class Meta:
+        unique_together = ("doi", "min_percent", "max_percent", "model_id")
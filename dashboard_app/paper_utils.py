@@ -1,6 +1,6 @@
 from django.shortcuts import render, get_object_or_404
 from .models import Papers, Authors, Keywords, Author_Papers, Keywords_Paper
-from .summarize_utils import summarize_text
+from .summary_utils import Summarize_Within, Cached_Summary, Streaming_Enabled
 
 def Render_Paper(request):
     doi = request.GET.get("doi")
@@ -27,19 +27,27 @@ def Render_Paper(request):
     except ValueError:
         max_percent = 60
 
-    summary_text = ""
+    # A cold summary is streamed into the page from /api/summary/stream; behind the inference server
+    # the page waits up to the latency budget, then shows the TF-IDF summary and polls /api/summary
+    summary_text, summary_status = "", "ready"
     if paper.abstract:
-        summary_text = summarize_text(
-            paper.abstract,
-            min_percent=min_percent,
-            max_percent=max_percent,
-        )
+        if Streaming_Enabled():
+            summary_text = Cached_Summary(paper, min_percent, max_percent)
+            if summary_text is None:
+                summary_text, summary_status = "", "streaming"
+        else:
+            summary_text, summary_status = Summarize_Within(
+                paper,
+                min_percent=min_percent,
+                max_percent=max_percent,
+            )
 
     context = {
         "paper": paper,
         "authors": authors,
         "topics": topics,
         "summary": summary_text,
+        "summary_status": summary_status,
         "min_percent": min_percent,
         "max_percent": max_percent,
     }
@@ -0,0 +1,107 @@
+from collections import Counter
+from django.db import connection, transaction
+from django.db.models import Count, F
+from .models import Papers, Keywords_Paper, Papers_Year, Keywords_Year, Data_Epoch
+
+
+# Every ingest path that inserts Papers or Keywords_Paper rows reports them here,
+# so the home dashboard can read pre-aggregated counts instead of the junction table.
+# Each change also bumps the corpus epoch, which versions anything cached from this data.
+CORPUS_EPOCH = "corpus"
+
+
+def current_epoch(name=CORPUS_EPOCH):
+    epoch = Data_Epoch.objects.filter(name=name).values_list("epoch", flat=True).first()
+    return epoch or 0
+
+
+def current_epochs(*names):
+    """Several epochs in one query, in the order given."""
+    epochs = dict(Data_Epoch.objects.filter(name__in=names).values_list("name", "epoch"))
+    return tuple(epochs.get(name, 0) for name in names)
+
+
+def bump_epoch(name=CORPUS_EPOCH):
+    if not Data_Epoch.objects.filter(name=name).update(epoch=F("epoch") + 1):
+        Data_Epoch.objects.get_or_create(name=name, defaults={"epoch": 1})
+
+
+def _upsert_counts(model, key_fields, counts):
+    """Adds each delta in `counts` ({key tuple: delta}) to the matching rollup row."""
+    rows = [(*key, delta) for key, delta in counts.items() if delta]
+    if not rows:
+        return
+
+    table = model._meta.db_table
+    key_columns = [model._meta.get_field(f).column for f in key_fields]
+    columns = ", ".join(key_columns + ["paper_count"])
+    placeholders = ", ".join(["(" + ", ".join(["%s"] * (len(key_columns) + 1)) + ")"] * len(rows))
+    sql = (
+        f"INSERT INTO {table} ({columns}) VALUES {placeholders} "
+        f"ON CONFLICT ({', '.join(key_columns)}) "
+        f"DO UPDATE SET paper_count = {table}.paper_count + EXCLUDED.paper_count"
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [value for row in rows for value in row])
+    bump_epoch()
+
+
+def insert_new(model, objs, key_fields):
+    """
+    INSERT ... ON CONFLICT DO NOTHING RETURNING: inserts `objs` and returns the `key_fields`
+    tuples of the rows this statement actually inserted. Rows that already existed, or that a
+    concurrent writer inserted first, are left out, so callers can count exactly their own inserts.
+    """
+    objs = list(objs)
+    if not objs:
+        return set()
+
+    # Auto ids and trigger-maintained columns (search_vector) are left to the database
+    fields = [f for f in model._meta.concrete_fields if f.editable and not f.auto_created]
+    table = model._meta.db_table
+    columns = ", ".join(f.column for f in fields)
+    placeholders = ", ".join(["(" + ", ".join(["%s"] * len(fields)) + ")"] * len(objs))
+    returning = ", ".join(model._meta.get_field(f).column for f in key_fields)
+    sql = f"INSERT INTO {table} ({columns}) VALUES {placeholders} ON CONFLICT DO NOTHING RETURNING {returning}"
+    params = [f.get_db_prep_save(getattr(obj, f.attname), connection) for obj in objs for f in fields]
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return set(cursor.fetchall())
+
+
+def record_papers(years):
+    """Counts newly inserted papers, given their publishing years."""
+    counts = Counter((year,) for year in years if year is not None)
+    _upsert_counts(Papers_Year, ["publishing_year"], counts)
+
+
+def record_keyword_links(links):
+    """Counts newly inserted Keywords_Paper rows, given (keyword_id, publishing_year) pairs."""
+    counts = Counter((keyword_id, year) for keyword_id, year in links if year is not None)
+    _upsert_counts(Keywords_Year, ["keyword_id", "publishing_year"], counts)
+
+
+@transaction.atomic
+def rebuild_rollups():
+    """Recomputes both rollup tables from scratch (after deletes or bulk fixes)."""
+    Papers_Year.objects.all().delete()
+    Keywords_Year.objects.all().delete()
+
+    Papers_Year.objects.bulk_create(
+        Papers_Year(publishing_year=row["publishing_year"], paper_count=row["total"])
+        for row in Papers.objects.values("publishing_year").annotate(total=Count("doi")).order_by()
+    )
+    Keywords_Year.objects.bulk_create(
+        (
+            Keywords_Year(
+                keyword_id_id=row["keyword_id"],
+                publishing_year=row["doi__publishing_year"],
+                paper_count=row["total"],
+            )
+            for row in Keywords_Paper.objects.values("keyword_id", "doi__publishing_year")
+            .annotate(total=Count("id"))
+            .order_by()
+        ),
+        batch_size=5000,
+    )
+    bump_epoch()
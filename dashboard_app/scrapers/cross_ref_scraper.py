@@ -12,6 +12,7 @@ from dashboard_app.Keyword_extraction import KeywordExtractor
 from dashboard_app.const import Config
 from dashboard_app.scrapers.base_scraper import BaseScraper
 from dashboard_app.models import Papers, Authors, Keywords, Keywords_Paper, Author_Papers
+from dashboard_app import rollup_utils, embedding_utils
 from dashboard_app.const import PaperTypes
 from django.db.models import F, Func, Max, Value
 from django.db.models.functions import Cast, Substr
@@ -207,6 +208,7 @@ class CrossRefScraper(BaseScraper):
     def __init__(self, queries=utils.Generate_Seeds("seeds.csv")):
         self.queries = queries
         self.other_papers = []
+        self.keyword_extractor = KeywordExtractor()
     
     #----------------------------Sync Scraping------------------------------#
     def RunScraper(self):
@@ -494,8 +496,7 @@ class CrossRefScraper(BaseScraper):
         if not abstract or not isinstance(abstract, str) or len(abstract.strip()) == 0:
             return []
         
-        kw_model = KeywordExtractor()
-        keywords = kw_model.ExtractTopics(abstract)
+        keywords = self.keyword_extractor.ExtractTopics(abstract)
         kw_list = []
         for keyword in keywords:
             max_id =(
@@ -560,6 +561,7 @@ class CrossRefScraper(BaseScraper):
                     },
                 )
                 if created:
+                    rollup_utils.record_papers([obj.publishing_year])
                     self.logger.info(f"[DB] Saved: {paper.get('title')}")
                 else:
                     self.logger.info(f"[DB] Already exists: {doi}")
@@ -599,15 +601,24 @@ class CrossRefScraper(BaseScraper):
                     )
 
                 if keyword_objs:
-                    Keywords_Paper.objects.bulk_create(
+                    # Only links this insert created are counted (another scraper may race us)
+                    inserted = rollup_utils.insert_new(
+                        Keywords_Paper,
                         [Keywords_Paper(doi=obj, keyword_id=k) for k in keyword_objs],
-                        ignore_conflicts=True,
+                        ["keyword_id"],
+                    )
+                    rollup_utils.record_keyword_links(
+                        (keyword_id, obj.publishing_year) for (keyword_id,) in inserted
                     )
 
                 self.logger.info(
                     f"[DB] Linked {len(author_objs)} authors & {len(keyword_objs)} keywords to {obj.title}"
                 )
 
+            # ---- EMBEDDING (outside the transaction: inference is slow) ----
+            if created:
+                embedding_utils.store_embeddings([obj])
+
 
         except IntegrityError as e:
             self.logger.error(f"[DB] IntegrityError: {e}")
@@ -628,9 +639,18 @@ class CrossRefScraper(BaseScraper):
                 paper_type=paper.get("paper_type"),
             ))
         try:
-            Papers.objects.bulk_create(objs, ignore_conflicts=True)
+            with transaction.atomic():
+                inserted = {doi for (doi,) in rollup_utils.insert_new(Papers, objs, ["doi"])}
+                new_papers = {o.doi: o for o in objs if o.doi in inserted}
+                rollup_utils.record_papers(o.publishing_year for o in new_papers.values())
         except IntegrityError:
-            pass  # safe to ignore since we used ignore_conflicts
+            new_papers = {}  # safe to ignore since we used ignore_conflicts
+
+        # The papers are committed by now; a failed encode must not skip the authors and topics below
+        try:
+            embedding_utils.store_embeddings(new_papers.values())
+        except Exception as e:
+            print(f"[WARN] Embedding {len(new_papers)} papers failed, left for embed_papers to backfill: {e}")
         obj_auth = [Authors(id=a["id"], name=a["name"]) for a in authors]
         try:
             Authors.objects.bulk_create(obj_auth, ignore_conflicts=True)
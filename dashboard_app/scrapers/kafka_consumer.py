@@ -5,6 +5,7 @@ import logging
 import time
 from dashboard_app.scrapers.cross_ref_scraper import CrossRefScraper
 from dashboard_app.scrapers.kafka_producer import KafkaProducer_WithBackOff
+from dashboard_app import model_utils
 
 import os
 import django
@@ -30,6 +31,7 @@ class CrossRefKafkaWorker:
         )
         self.scraper = CrossRefScraper()
         self.producer = KafkaProducer_WithBackOff()
+        model_utils.warm_models("keybert")  # load before the first message, not during it
         self.produce_topic = produce_topic
 
     def consume_and_scrape(self, max_depth=2, current_depth=0, polite_delay=1.0):
@@ -95,6 +97,7 @@ class CrossRefKafkaWorkerAsync:
         self.produce_topic = produce_topic
         self.scraper = CrossRefScraper()
         self.concurency_limit = 5
+        model_utils.warm_models("keybert")  # load before the first message, not during it
 
     async def start(self, max_depth=2, polite_delay=2):
         """Start consuming and processing Kafka messages asynchronously."""
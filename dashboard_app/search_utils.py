@@ -4,42 +4,383 @@ import django
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "dashboard.settings")  # Adjust if your settings module is named differently
 django.setup()
 
+import re
+import json
+import math
+import base64
+import threading
+from collections import OrderedDict
 from django.shortcuts import render
-from django.db.models import Q
+from django.http import JsonResponse, HttpResponseBadRequest
+from django.utils.html import escape, strip_tags
+from django.utils.safestring import mark_safe
+from django.db import connection
+from django.db.models import Count, Exists, F, OuterRef, Q, FloatField, Value, Window
+from django.db.models.functions import Coalesce, Ln
+from django.contrib.postgres.search import SearchHeadline, SearchQuery, SearchRank, SearchVector, TrigramWordSimilarity
+from nltk.stem import SnowballStemmer
 from .models import Papers, Authors, Keywords, Author_Papers, Keywords_Paper
+from . import embedding_utils, rollup_utils
+
+
+# Same weighting as the database trigger that fills Papers.search_vector
+PAPER_SEARCH_VECTOR = SearchVector("title", weight="A", config="english") + SearchVector("abstract", weight="B", config="english")
+
+# How much citations move a paper up, relative to its text relevance (ts_rank is roughly 0..1)
+CITATION_WEIGHT = 0.05
+
+ORCID_PATTERN = re.compile(r"^\d{4}-\d{4}-\d{4}-\d{3}[\dX]$")
+MAX_AUTHOR_MATCHES = 20
+MAX_KEYWORD_MATCHES = 50
+
+# Search results are keyset-paginated on (-score, -citations_count, -publishing_year, doi)
+PAGE_SIZE = 20
+RESULT_ORDER = ("-score", "-citations_count", "-publishing_year", "doi")
+
+# Semantic mode returns the top-k nearest papers instead of pages
+SEMANTIC_RESULTS = 20
+MAX_SEMANTIC_RESULTS = 100
+
+# Facets: publishing years are grouped into buckets of this many years
+YEAR_BUCKET = 5
+FACET_KEYWORDS = 10
+
+# Result pages kept per process; popular queries (the scraper seed terms) stay resident
+SEARCH_CACHE_SIZE = 512
+
+
+def Match_Authors(query):
+    # Exact ORCID: B-tree lookup instead of a substring scan
+    orcid = query.upper()
+    if ORCID_PATTERN.match(orcid):
+        return Authors.objects.filter(orcid=orcid)
+
+    # Names: substring or near-miss word match ("Meltzof" -> "Meltzoff"), both served by the trigram GIN index
+    return (
+        Authors.objects.filter(Q(name__trigram_word_similar=query) | Q(name__icontains=query))
+        .annotate(similarity=TrigramWordSimilarity(query, "name"))
+        .order_by("-similarity", "name")[:MAX_AUTHOR_MATCHES]
+    )
+
+
+def Match_Keywords(query):
+    return (
+        Keywords.objects.filter(Q(keyword__trigram_word_similar=query) | Q(keyword__icontains=query))
+        .annotate(similarity=TrigramWordSimilarity(query, "keyword"))
+        .order_by("-similarity", "keyword")[:MAX_KEYWORD_MATCHES]
+    )
+
+
+def Encode_Cursor(paper, total):
+    payload = [paper.score, paper.citations_count, paper.publishing_year, paper.doi, total]
+    return base64.urlsafe_b64encode(json.dumps(payload, separators=(",", ":")).encode()).decode()
+
+
+def Decode_Cursor(cursor):
+    """
+    Returns (score, citations_count, publishing_year, doi, total) of the last row of the previous page,
+    None without a cursor; raises ValueError for a cursor we did not issue.
+    """
+    if not cursor:
+        return None
+    try:
+        score, citations, year, doi, total = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        score = float(score)
+        if not math.isfinite(score):
+            raise ValueError("non-finite score")
+        return score, int(citations), int(year), str(doi), int(total)
+    except (ValueError, TypeError, OverflowError) as e:
+        raise ValueError(f"invalid cursor: {e}") from e
+
+
+def Keyset_Page(papers, cursor):
+    """
+    One page of `papers` (ordered by RESULT_ORDER) after the cursor position, plus the total match count.
+    Seeks past the previous page instead of using OFFSET, so page N costs the same as page 1.
+    """
+    after = Decode_Cursor(cursor)
+    if after:
+        score, citations, year, doi, total = after
+        papers = papers.filter(
+            Q(score__lt=score)
+            | Q(score=score, citations_count__lt=citations)
+            | Q(score=score, citations_count=citations, publishing_year__lt=year)
+            | Q(score=score, citations_count=citations, publishing_year=year, doi__gt=doi)
+        )
+    else:
+        # Count every match in the same query (the window runs before LIMIT); later pages carry it in the cursor
+        papers = papers.annotate(total_matches=Window(Count("doi")))
+
+    page = list(papers.order_by(*RESULT_ORDER)[:PAGE_SIZE + 1])
+    if not after:
+        total = page[0].total_matches if page else 0
+    next_cursor = Encode_Cursor(page[PAGE_SIZE - 1], total) if len(page) > PAGE_SIZE else None
+    return page[:PAGE_SIZE], next_cursor, total
+
+
+def Matching_Papers(query):
+    """
+    Papers matching `query` by author, keyword or full text, ranked by score.
+    The three branches are EXISTS / tsvector conditions of a single query, so no DOI list leaves the database.
+    """
+    text_query = SearchQuery(query, search_type="websearch", config="english")
+    by_author = Author_Papers.objects.filter(doi=OuterRef("doi"), author_id__in=Match_Authors(query).values("id"))
+    by_keyword = Keywords_Paper.objects.filter(doi=OuterRef("doi"), keyword_id__in=Match_Keywords(query).values("id"))
+
+    return (
+        Papers.objects.filter(Q(search_vector=text_query) | Exists(by_author) | Exists(by_keyword))
+        .defer("abstract", "search_vector")
+        .annotate(rank=Coalesce(SearchRank(F("search_vector"), text_query), Value(0.0)))
+        .annotate(score=F("rank") + Value(CITATION_WEIGHT) * Ln(F("citations_count") + 1, output_field=FloatField()))
+        .annotate(headline=SearchHeadline(
+            "abstract", text_query, config="english",
+            start_sel=HEADLINE_START, stop_sel=HEADLINE_STOP, max_words=35, min_words=15,
+        ))
+    )
+
+
+# ts_headline marks matches with these (private-use) characters; the snippet is escaped before they become <mark>
+HEADLINE_START, HEADLINE_STOP = "\ue000", "\ue001"
+
+
+def Safe_Headline(headline):
+    """HTML for a ts_headline snippet of an untrusted abstract: tags dropped, text escaped, matches in <mark>."""
+    text = escape(strip_tags(headline or ""))
+    return mark_safe(text.replace(HEADLINE_START, "<mark>").replace(HEADLINE_STOP, "</mark>"))
+
+
+# --- Facets ---
+def Selected_Facets(request):
+    """(year bucket, paper_type, keyword id) picked in the request; None where not set or invalid."""
+    try:
+        year = int(request.GET["year"]) if request.GET.get("year") else None
+    except ValueError:
+        year = None
+    return year, request.GET.get("type") or None, request.GET.get("keyword") or None
+
+
+def Apply_Facets(papers, facets):
+    year, paper_type, keyword_id = facets
+    if year is not None:
+        papers = papers.filter(publishing_year__gte=year, publishing_year__lt=year + YEAR_BUCKET)
+    if paper_type:
+        papers = papers.filter(paper_type=paper_type)
+    if keyword_id:
+        papers = papers.filter(keywords_paper__keyword_id=keyword_id)
+    return papers
+
+
+def Facet_Counts(papers):
+    """
+    Year-bucket, paper_type and top co-occurring keyword counts of the matched set.
+    The match runs once as a CTE and every facet is a GROUP BY over it, all in one query.
+    """
+    matched_sql, params = papers.values("doi", "publishing_year", "paper_type").query.sql_with_params()
+    link_table = Keywords_Paper._meta.db_table
+    link_doi = Keywords_Paper._meta.get_field("doi").column
+    link_keyword = Keywords_Paper._meta.get_field("keyword_id").column
+    keyword_table = Keywords._meta.db_table
+
+    sql = f"""
+        WITH matched AS ({matched_sql})
+        SELECT 'year', ((publishing_year / {YEAR_BUCKET}) * {YEAR_BUCKET})::text, NULL, COUNT(*) FROM matched GROUP BY 2
+        UNION ALL
+        SELECT 'type', paper_type, NULL, COUNT(*) FROM matched GROUP BY 2
+        UNION ALL
+        (
+            SELECT 'keyword', k.id, k.keyword, COUNT(*)
+            FROM matched m
+            JOIN {link_table} kp ON kp.{link_doi} = m.doi
+            JOIN {keyword_table} k ON k.id = kp.{link_keyword}
+            GROUP BY k.id, k.keyword
+            ORDER BY 4 DESC, k.keyword
+            LIMIT {FACET_KEYWORDS}
+        )
+    """
+    facets = {"years": [], "types": [], "keywords": []}
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        for facet, value, label, count in cursor.fetchall():
+            if facet == "year":
+                facets["years"].append({"value": int(value), "label": f"{value}–{int(value) + YEAR_BUCKET - 1}", "count": count})
+            elif facet == "type":
+                facets["types"].append({"value": value, "label": value, "count": count})
+            else:
+                facets["keywords"].append({"value": value, "label": label, "count": count})
+
+    facets["years"].sort(key=lambda item: item["value"], reverse=True)
+    facets["types"].sort(key=lambda item: (-item["count"], item["value"]))
+    return facets
+
+
+# --- Result cache ---
+# Same algorithm as the `english` text search config, so inflections that share a tsquery share a key
+STEMMER = SnowballStemmer("english")
+WORD_PATTERN = re.compile(r"\w+")
+
+
+def Clean_Query(query):
+    """Lower case, single spaces: the form searched and used for the author/keyword lookups."""
+    return " ".join(query.lower().split())
+
+
+def Normalise_Query(query):
+    """
+    Cache key form of a query: Clean_Query with every word stemmed ("networks" -> "network").
+    Operators and quotes of websearch syntax are kept as typed.
+    """
+    return WORD_PATTERN.sub(lambda word: STEMMER.stem(word.group()), Clean_Query(query))
+
+
+class SearchResultCache:
+    """
+    Size-bounded LRU of result pages. Entries belong to one data epoch;
+    the first lookup under a newer epoch (the scrapers bump it on commit) drops them all.
+    """
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._epoch = None
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.evictions = 0
+
+    def _sync_epoch(self, epoch):
+        if epoch != self._epoch:
+            self._entries.clear()
+            self._epoch = epoch
+
+    def get(self, key, epoch):
+        with self._lock:
+            self._sync_epoch(epoch)
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def set(self, key, epoch, entry):
+        with self._lock:
+            self._sync_epoch(epoch)
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = self.evictions = 0
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+SEARCH_CACHE = SearchResultCache(SEARCH_CACHE_SIZE)
+
+
+def Run_Search(query, mode, cursor, facets=(None, None, None)):
+    """Returns (papers, next_cursor, total_matches) for one results page."""
+    if mode == "semantic":
+        papers = embedding_utils.Semantic_Search(query, SEMANTIC_RESULTS)
+        return papers, None, len(papers)
+
+    papers, next_cursor, total_matches = Keyset_Page(Apply_Facets(Matching_Papers(query), facets), cursor)
+    for paper in papers:
+        paper.headline = Safe_Headline(paper.headline)
+    return papers, next_cursor, total_matches
 
 
 def Search_Query(request):
     query = request.GET.get("q","").strip()
-    authors = []
-    papers = []
-    
+    cursor = request.GET.get("cursor") or ""
+    mode = "semantic" if request.GET.get("mode") == "semantic" else "keyword"
+    selected = Selected_Facets(request)
+    authors, papers, next_cursor, total_matches, facets = [], [], None, 0, None
+    try:
+        Decode_Cursor(cursor)
+    except ValueError:
+        return HttpResponseBadRequest("Invalid cursor.")
+
     if query:
-        authors = Authors.objects.filter(Q(name__icontains=query) | Q(orcid__icontains=query))
-        
-        if authors.exists():
-            author_papers = Author_Papers.objects.filter(author_id__in=authors)
-            authors_doi = author_papers.values_list("doi", flat=True).distinct()
-        else:
-            authors_doi = []
-            
-        keyword_matches = Keywords.objects.filter(keyword__icontains=query)
-        keyword_dois = Keywords_Paper.objects.filter(keyword_id__in=keyword_matches).values_list("doi", flat=True).distinct()
-
-        text_dois = Papers.objects.filter(
-            Q(title__icontains=query) | Q(abstract__icontains=query)
-        ).values_list("doi", flat=True)
-
-        all_related_dois = set(authors_doi) | set(keyword_dois) | set(text_dois)
-        papers = Papers.objects.filter(doi__in=all_related_dois).order_by("-citations_count", "-publishing_year")
-
-        if not authors.exists() and not papers.exists():
-            papers = Papers.objects.filter(
-                Q(title__icontains=query) | Q(abstract__icontains=query)
-            ).order_by("-citations_count", "-publishing_year")
+        text = Clean_Query(query)
+        # Paper pages share an entry across inflections; semantic mode embeds the words as typed
+        normalised = Normalise_Query(text) if mode == "keyword" else text
+        epoch = rollup_utils.current_epochs(rollup_utils.CORPUS_EPOCH, embedding_utils.EMBEDDING_EPOCH)
+
+        key = (mode, normalised, cursor, selected)
+        results = SEARCH_CACHE.get(key, epoch)
+        if results is None:
+            results = Run_Search(text, mode, cursor, selected)
+            # Semantic results from an index still catching up to the epoch are not cached under it
+            if mode != "semantic" or embedding_utils.index_is_current(epoch[1]):
+                SEARCH_CACHE.set(key, epoch, results)
+        papers, next_cursor, total_matches = results
+
+        if mode == "keyword":
+            # Author names are not stemmed ("Williams" is not "William"), so their entry keeps the raw text
+            authors = SEARCH_CACHE.get(("authors", text), epoch)
+            if authors is None:
+                authors = list(Match_Authors(text))
+                SEARCH_CACHE.set(("authors", text), epoch, authors)
+
+            # Counts describe the whole match, so picking a facet reuses them instead of recounting
+            facets = SEARCH_CACHE.get(("facets", normalised), epoch)
+            if facets is None:
+                facets = Facet_Counts(Matching_Papers(text))
+                SEARCH_CACHE.set(("facets", normalised), epoch, facets)
+
+    year, paper_type, keyword_id = selected
 
     context = {
+        "mode": mode,
         "authors": authors,
         "papers": papers,
+        "next_cursor": next_cursor,
+        "total_matches": total_matches,
+        "is_first_page": not cursor,
+        "facets": facets,
+        "selected_year": year,
+        "selected_type": paper_type,
+        "selected_keyword": keyword_id,
     }
-    return render(request, "search.html", context)
\ No newline at end of file
+    return render(request, "search.html", context)
+
+
+def Semantic_Search_Api(request):
+    """JSON nearest-neighbour search: /api/search/semantic?q=&k="""
+    query = request.GET.get("q", "").strip()
+    if not query:
+        return JsonResponse({"error": "q is required"}, status=400)
+    try:
+        k = min(max(int(request.GET.get("k", SEMANTIC_RESULTS)), 1), MAX_SEMANTIC_RESULTS)
+    except ValueError:
+        return JsonResponse({"error": "k must be an integer"}, status=400)
+
+    results = [
+        {
+            "doi": paper.doi,
+            "title": paper.title,
+            "publishing_year": paper.publishing_year,
+            "citations_count": paper.citations_count,
+            "similarity": round(paper.similarity, 4),
+        }
+        for paper in embedding_utils.Semantic_Search(query, k)
+    ]
+    return JsonResponse({"query": query, "results": results}, json_dumps_params={"separators": (",", ":")})
+
+
+def Search_Cache_Stats(request):
+    """Hit/miss counters of this worker's result cache: /api/search/cache"""
+    return JsonResponse(SEARCH_CACHE.stats())
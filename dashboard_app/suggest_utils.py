@@ -0,0 +1,263 @@
+import re
+import heapq
+import threading
+import time
+from datetime import timedelta
+from bisect import bisect_left, insort
+from django.db import close_old_connections
+from django.db.models import Sum
+from django.db.models.signals import post_save
+from django.http import JsonResponse
+from .models import Papers, Authors, Keywords, Author_Papers, Keywords_Paper
+from . import rollup_utils
+
+
+SUGGEST_LIMIT = 5
+MAX_SUGGEST_LIMIT = 20
+SUGGEST_REFRESH_SECONDS = 60
+# New rows are appended every refresh; the full re-weighted rebuild only runs this often
+SUGGEST_REBUILD_SECONDS = 6 * 60 * 60
+# Each refresh re-reads rows created this long before the newest one it has seen, so rows whose
+# transaction started earlier but committed after the last refresh are not missed
+SUGGEST_WATERMARK_LAG = timedelta(minutes=5)
+
+# One- and two-letter prefixes span thousands of words; their answers are memoised
+SHORT_PREFIX = 2
+
+TOKEN_PATTERN = re.compile(r"\w+")
+
+
+def _tokens(text):
+    return TOKEN_PATTERN.findall((text or "").lower())
+
+
+class PrefixIndex:
+    """
+    Word-prefix index over short labels (titles, names, keywords).
+    Entries are numbered by descending weight and every word keeps a sorted posting list
+    of entry numbers, so the best matches of a prefix are the smallest numbers across the
+    postings of the words in its bisect range.
+    """
+
+    def __init__(self, entries, recent=()):
+        # entries: (label, ref, weight); recent: refs among them that a refresh may read again
+        entries = sorted(entries, key=lambda entry: (-entry[2], entry[0]))
+        self.labels = [label for label, _, _ in entries]
+        self.refs = [ref for _, ref, _ in entries]
+        self.added = set(recent)  # so a row arriving twice (signal, then refresh) is indexed once
+        self.postings = {}
+        for number, label in enumerate(self.labels):
+            for word in set(_tokens(label)):
+                self.postings.setdefault(word, []).append(number)
+        self.words = sorted(self.postings)
+        self._short_results = {}
+        self._lock = threading.Lock()
+
+    def add(self, label, ref):
+        """Appends a new row; it ranks below the weighted entries until the next rebuild."""
+        with self._lock:
+            if ref in self.added:
+                return
+            self.added.add(ref)
+            number = len(self.labels)
+            self.labels.append(label)
+            self.refs.append(ref)
+            for word in set(_tokens(label)):
+                if word not in self.postings:
+                    self.postings[word] = []
+                    insort(self.words, word)
+                self.postings[word].append(number)
+            self._short_results = {}
+
+    def search(self, query, limit=SUGGEST_LIMIT):
+        """Entries containing every complete word of `query` and a word starting with its last one."""
+        tokens = _tokens(query)
+        if not tokens:
+            return []
+        *complete, prefix = tokens
+        # Under the lock add() holds, so the refresh thread never changes a posting list mid-merge
+        with self._lock:
+            if not complete and len(prefix) <= SHORT_PREFIX:
+                key = (prefix, limit)
+                if key not in self._short_results:
+                    self._short_results[key] = self._search(complete, prefix, limit)
+                return self._short_results[key]
+            return self._search(complete, prefix, limit)
+
+    def _search(self, complete, prefix, limit):
+        required = [self.postings.get(word) for word in complete]
+        if any(posting is None for posting in required):
+            return []
+
+        start = bisect_left(self.words, prefix)
+        stop = bisect_left(self.words, prefix + "\uffff")
+        streams = [self.postings[word] for word in self.words[start:stop]]
+
+        matches, previous = [], None
+        for number in heapq.merge(*streams):
+            if number == previous:
+                continue
+            previous = number
+            if all(_contains(posting, number) for posting in required):
+                matches.append(number)
+                if len(matches) == limit:
+                    break
+        return [(self.labels[number], self.refs[number]) for number in matches]
+
+
+def _contains(posting, number):
+    position = bisect_left(posting, number)
+    return position < len(posting) and posting[position] == number
+
+
+class SuggestIndex:
+    """Titles, author names and keywords, each weighted by the citations of their papers."""
+
+    # (index attribute, model, label field)
+    SOURCES = (("titles", Papers, "title"), ("authors", Authors, "name"), ("keywords", Keywords, "keyword"))
+
+    def __init__(self, titles, authors, keywords, epoch=None, created=None):
+        # created: {index attribute: {ref: created}} of the rows read, for the refresh watermarks
+        created = created or {}
+        self.watermarks = {}
+        for name, entries in (("titles", titles), ("authors", authors), ("keywords", keywords)):
+            times = created.get(name, {})
+            watermark = max(times.values(), default=None)
+            recent = [ref for ref, at in times.items() if at >= watermark - SUGGEST_WATERMARK_LAG]
+            setattr(self, name, PrefixIndex(entries, recent))
+            self.watermarks[name] = watermark
+        self.epoch = epoch
+
+    @classmethod
+    def from_db(cls):
+        epoch = rollup_utils.current_epoch()
+        created = {name: dict(model.objects.values_list("pk", "created")) for name, model, _ in cls.SOURCES}
+        titles = Papers.objects.values_list("title", "doi", "citations_count")
+
+        author_citations = dict(
+            Author_Papers.objects.values("author_id").annotate(total=Sum("doi__citations_count")).order_by()
+            .values_list("author_id", "total")
+        )
+        authors = [
+            (name, author_id, author_citations.get(author_id) or 0)
+            for author_id, name in Authors.objects.values_list("id", "name")
+        ]
+
+        keyword_citations = dict(
+            Keywords_Paper.objects.values("keyword_id").annotate(total=Sum("doi__citations_count")).order_by()
+            .values_list("keyword_id", "total")
+        )
+        keywords = [
+            (keyword, keyword_id, keyword_citations.get(keyword_id) or 0)
+            for keyword_id, keyword in Keywords.objects.values_list("id", "keyword")
+        ]
+        return cls(titles, authors, keywords, epoch, created)
+
+    def add_new_rows(self):
+        """
+        Appends the rows other processes saved since the last refresh: those created after each
+        table's watermark (less SUGGEST_WATERMARK_LAG), read through the `created` index.
+        """
+        epoch = rollup_utils.current_epoch()
+        for name, model, label in self.SOURCES:
+            index, watermark = getattr(self, name), self.watermarks[name]
+            rows = model.objects.all() if watermark is None else model.objects.filter(created__gte=watermark - SUGGEST_WATERMARK_LAG)
+            for ref, text, created in rows.order_by("created").values_list("pk", label, "created"):
+                index.add(text, ref)
+                watermark = created if watermark is None else max(watermark, created)
+            self.watermarks[name] = watermark
+        self.epoch = epoch
+
+    def suggest(self, query, limit=SUGGEST_LIMIT):
+        return {
+            "titles": [{"title": label, "doi": ref} for label, ref in self.titles.search(query, limit)],
+            "authors": [{"name": label, "id": ref} for label, ref in self.authors.search(query, limit)],
+            "keywords": [{"keyword": label, "id": ref} for label, ref in self.keywords.search(query, limit)],
+        }
+
+
+# --- One index per worker: built in the background at start, then kept up to date by the same thread ---
+_index = None
+_index_lock = threading.Lock()
+_refresher = None
+_refresher_lock = threading.Lock()
+
+
+def get_suggest_index():
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                _index = SuggestIndex.from_db()
+    return _index
+
+
+def clear_suggest_index():
+    global _index
+    _index = None
+
+
+def _refresh_loop():
+    global _index
+    rebuilt = time.monotonic()
+    while True:
+        close_old_connections()
+        try:
+            if _index is None or time.monotonic() - rebuilt >= SUGGEST_REBUILD_SECONDS:
+                _index = SuggestIndex.from_db()
+                rebuilt = time.monotonic()
+            elif rollup_utils.current_epoch() != _index.epoch:
+                _index.add_new_rows()
+        except Exception as e:
+            print(f"[WARN] Suggest index refresh failed, keeping the previous index: {e}")
+        finally:
+            close_old_connections()
+        time.sleep(SUGGEST_REFRESH_SECONDS)
+
+
+def warm_suggest_index():
+    """
+    Starts the refresher thread, which builds the index first (called once per worker from
+    wsgi.py); the worker boots without waiting for the build, or for the database to be up.
+    """
+    global _refresher
+    with _refresher_lock:
+        if _refresher is None:
+            _refresher = threading.Thread(target=_refresh_loop, name="suggest-index-refresh", daemon=True)
+            _refresher.start()
+
+
+# Rows saved by this process are added right away; other processes' rows arrive with the next refresh
+def _on_paper_saved(sender, instance, created, **kwargs):
+    if created and _index is not None:
+        _index.titles.add(instance.title, instance.doi)
+
+
+def _on_author_saved(sender, instance, created, **kwargs):
+    if created and _index is not None:
+        _index.authors.add(instance.name, instance.id)
+
+
+def _on_keyword_saved(sender, instance, created, **kwargs):
+    if created and _index is not None:
+        _index.keywords.add(instance.keyword, instance.id)
+
+
+post_save.connect(_on_paper_saved, sender=Papers, dispatch_uid="suggest_index_papers")
+post_save.connect(_on_author_saved, sender=Authors, dispatch_uid="suggest_index_authors")
+post_save.connect(_on_keyword_saved, sender=Keywords, dispatch_uid="suggest_index_keywords")
+
+
+def Suggest_Api(request):
+    """Typeahead suggestions for a prefix: /api/suggest?q=&limit="""
+    query = request.GET.get("q", "").strip()
+    try:
+        limit = min(max(int(request.GET.get("limit", SUGGEST_LIMIT)), 1), MAX_SUGGEST_LIMIT)
+    except ValueError:
+        return JsonResponse({"error": "limit must be an integer"}, status=400)
+
+    index = _index
+    if index is None:
+        warm_suggest_index()  # no suggestions until the first build is done
+    suggestions = index.suggest(query, limit) if query and index else {"titles": [], "authors": [], "keywords": []}
+    return JsonResponse({"query": query, **suggestions}, json_dumps_params={"separators": (",", ":")})
@@ -1,20 +1,69 @@
 from transformers import pipeline
-from transformers import AutoTokenizer, AutoModelForSeq2SeqLM
-from sklearn.feature_extraction.text import TfidfVectorizer
+from transformers import AutoTokenizer, AutoModelForSeq2SeqLM, TextIteratorStreamer, StoppingCriteria, StoppingCriteriaList
+from transformers.modeling_outputs import BaseModelOutput
+from sklearn.feature_extraction.text import TfidfVectorizer, HashingVectorizer
 from sklearn.metrics.pairwise import cosine_similarity
-import re, numpy as np
+from sklearn.utils.sparsefuncs_fast import inplace_csr_row_normalize_l2
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+import os, re, queue, hashlib, threading, time, numpy as np
+from collections import OrderedDict
+import torch
+from . import model_utils
 
 
-tokenizer = AutoTokenizer.from_pretrained("sshleifer/distilbart-cnn-12-6")
 model_name = "sshleifer/distilbart-cnn-12-6"
-SUMMARIZER = AutoModelForSeq2SeqLM.from_pretrained(model_name)
+tokenizer = None
+SUMMARIZER = None
+
+#  fp32: plain PyTorch weights
+#  int8: torch dynamic quantisation of every Linear layer (about half the memory, faster on CPU)
+#  onnx: ONNX Runtime graph via optimum (optional dependency)
+BACKENDS = ("fp32", "int8", "onnx")
 
 
 
 #  MODEL LOADING (DISTILBART)
+#  Loaded on first use: web workers that send summaries to the inference server never load it.
+
+def backend_name():
+    backend = getattr(settings, "SUMMARIZER_BACKEND", "fp32")
+    if backend not in BACKENDS:
+        raise ImproperlyConfigured(f"SUMMARIZER_BACKEND must be one of {BACKENDS}, not {backend!r}")
+    return backend
+
+
+def model_id():
+    """Identifies the weights that produce a summary (part of the summary cache key)."""
+    backend = backend_name()
+    return model_name if backend == "fp32" else f"{model_name}:{backend}"
+
+
+def load_summarizer(backend):
+    if backend == "onnx":
+        try:
+            from optimum.onnxruntime import ORTModelForSeq2SeqLM
+        except ImportError:
+            raise ImproperlyConfigured("The onnx summarizer backend requires optimum[onnxruntime]")
+        onnx_path = getattr(settings, "SUMMARIZER_ONNX_PATH", None)
+        # An exported graph loads directly; without one the model is exported at load time
+        return ORTModelForSeq2SeqLM.from_pretrained(onnx_path or model_name, export=not onnx_path)
+
+    model = AutoModelForSeq2SeqLM.from_pretrained(model_name)
+    if backend == "int8":
+        model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+    return model
+
+
+def load_tokenizer_and_model():
+    return AutoTokenizer.from_pretrained(model_name), load_summarizer(backend_name())
+
 
 def _get_summarizer():
-    global SUMMARIZER
+    # Loaded once per process through the model registry (which also times it)
+    global SUMMARIZER, tokenizer
+    if SUMMARIZER is None:
+        tokenizer, SUMMARIZER = model_utils.get_model("summarizer")
     return SUMMARIZER
 
 
@@ -25,16 +74,77 @@ def clean_text(html_or_text: str) -> str:
     return re.sub(r"<[^>]+>", "", html_or_text or "").strip()
 
 
+#  CORPUS IDF (for the TF-IDF fallback)
+#  Fitted offline over every abstract by `python manage.py fit_idf`. Words are hashed, so the
+#  artifact is a single float32 .npy of IDF weights per hash bucket, memory-mapped at load.
+
+IDF_FEATURES = 2 ** 18
+_hasher = HashingVectorizer(n_features=IDF_FEATURES, stop_words="english", alternate_sign=False, norm=None)
+_idf = None
+_idf_loaded = False
+
+
+def fit_idf(texts, chunk_size=1000):
+    """Smoothed IDF (the TfidfVectorizer formula) per hash bucket over an iterable of documents."""
+    df = np.zeros(IDF_FEATURES, dtype=np.int64)
+    documents, chunk = 0, []
+    for text in texts:
+        chunk.append(clean_text(text))
+        if len(chunk) == chunk_size:
+            df += np.bincount(_hasher.transform(chunk).indices, minlength=IDF_FEATURES)
+            documents, chunk = documents + len(chunk), []
+    if chunk:
+        df += np.bincount(_hasher.transform(chunk).indices, minlength=IDF_FEATURES)
+        documents += len(chunk)
+    return (np.log((1 + documents) / (1 + df)) + 1).astype(np.float32), documents
+
+
+def save_idf(idf, path):
+    tmp_path = f"{path}.tmp.npy"
+    np.save(tmp_path, idf)
+    os.replace(tmp_path, path)  # readers never see a half-written file
+
+
+def _corpus_idf():
+    """The memory-mapped IDF weights, or None until fit_idf has been run."""
+    global _idf, _idf_loaded
+    if not _idf_loaded:
+        path = getattr(settings, "SUMMARY_IDF_PATH", None)
+        _idf = np.load(path, mmap_mode="r") if path and os.path.exists(path) else None
+        _idf_loaded = True
+    return _idf
+
+
+def reset_corpus_idf():
+    global _idf, _idf_loaded
+    _idf, _idf_loaded = None, False
+
+
+def _tfidf_rows(sentences, idf):
+    """L2-normalised TF-IDF rows (sparse) of sentences under the corpus IDF."""
+    matrix = _hasher.transform(sentences)
+    matrix.data *= idf[matrix.indices]
+    inplace_csr_row_normalize_l2(matrix)
+    return matrix
+
+
 #  FALLBACK SUMMARIZER (TF-IDF)
 
-def _tfidf_fallback(text: str, min_percent: int, max_percent: int) -> str:
-    sentences = re.split(r'(?<=[.!?]) +', text)
-    if len(sentences) <= 2:
-        return text.strip()
+def _split_sentences(text):
+    return re.split(r'(?<=[.!?]) +', text)
+
+
+def _centrality(matrix):
+    # Each sentence's summed cosine similarity to all sentences. Only the hash buckets the
+    # sentences use are kept, so the product is a small dense one instead of 2**18 columns wide.
+    buckets, columns = np.unique(matrix.indices, return_inverse=True)
+    dense = np.zeros((matrix.shape[0], len(buckets)))
+    rows = np.repeat(np.arange(matrix.shape[0]), np.diff(matrix.indptr))
+    dense[rows, columns] = matrix.data
+    return dense @ dense.sum(axis=0)
+
 
-    tfidf = TfidfVectorizer(stop_words="english")
-    tfidf_matrix = tfidf.fit_transform(sentences)
-    scores = cosine_similarity(tfidf_matrix, tfidf_matrix).sum(axis=1)
+def _choose(sentences, scores, min_percent, max_percent):
     ranked_idx = np.argsort(scores)[::-1]
 
     min_sent = max(1, int(len(sentences) * (min_percent / 100.0)))
@@ -44,19 +154,184 @@ def _tfidf_fallback(text: str, min_percent: int, max_percent: int) -> str:
     return " ".join(chosen).strip()
 
 
+def _tfidf_fallback(text: str, min_percent: int, max_percent: int) -> str:
+    sentences = _split_sentences(text)
+    if len(sentences) <= 2:
+        return text.strip()
 
-#  MAIN SUMMARIZATION FUNCTION
+    idf = _corpus_idf()
+    if idf is not None:
+        scores = _centrality(_tfidf_rows(sentences, idf))
+    else:
+        # No corpus IDF yet: fall back to IDF over this abstract's own sentences
+        tfidf = TfidfVectorizer(stop_words="english")
+        tfidf_matrix = tfidf.fit_transform(sentences)
+        scores = cosine_similarity(tfidf_matrix, tfidf_matrix).sum(axis=1)
+    return _choose(sentences, scores, min_percent, max_percent)
 
-def summarize_text(text: str, min_percent: int = 30, max_percent: int = 60) -> str:
-    txt = clean_text(text)
-    if not txt:
-        return "No abstract available to summarize."
 
-    total_words = len(txt.split())
-    if total_words < 20:
-        return f"Abstract too short ({total_words} words)."
+def extractive_batch(texts, min_percent: int = 30, max_percent: int = 60):
+    """TF-IDF summaries of many texts, with every sentence vectorised in one transform (needs the corpus IDF for that)."""
+    min_percent, max_percent = normalise_percents(min_percent, max_percent)
+    texts = [clean_text(text) for text in texts]
+    idf = _corpus_idf()
+    if idf is None or not texts:
+        return [_tfidf_fallback(text, min_percent, max_percent) for text in texts]
 
-    # validate input %
+    split = [_split_sentences(text) for text in texts]
+    long_texts = [i for i, sentences in enumerate(split) if len(sentences) > 2]
+    matrix = _tfidf_rows([sentence for i in long_texts for sentence in split[i]], idf)
+
+    summaries = [text.strip() for text in texts]
+    start = 0
+    for i in long_texts:
+        stop = start + len(split[i])
+        summaries[i] = _choose(split[i], _centrality(matrix[start:stop]), min_percent, max_percent)
+        start = stop
+    return summaries
+
+
+
+#  GENERATION SETTINGS (shared by single and batched summaries)
+
+GENERATE_OPTIONS = dict(
+    #  ENABLE SAMPLING — REQUIRED for DistilBART to change length
+    do_sample=True,
+    #top_p=0.90,
+    temperature=0.85,
+
+    # encourage longer output
+    length_penalty=10,#9,
+    #no_repeat_ngram_size=3,
+    early_stopping=False,
+)
+
+
+def _token_budget(input_tokens, min_percent, max_percent):
+    min_tokens = max(25, int(input_tokens * (min_percent / 100.0)))
+    max_tokens = max(min_tokens + 10, round(input_tokens * (max_percent / 100.0)))
+    return min_tokens, max_tokens
+
+
+
+#  DECODE COST (latency budgets)
+
+# Rough BART tokens per word, for estimates made before (or without) loading the tokenizer
+TOKENS_PER_WORD = 1.3
+
+
+class DecodeCost:
+    """Moving average of model seconds per input token, measured on every single-abstract generate call."""
+
+    def __init__(self, alpha=0.2):
+        self.alpha = alpha
+        self.seconds_per_token = None
+        self._lock = threading.Lock()
+
+    def observe(self, seconds, input_tokens):
+        if input_tokens <= 0:
+            return
+        cost = seconds / input_tokens
+        with self._lock:
+            if self.seconds_per_token is None:
+                self.seconds_per_token = cost
+            else:
+                self.seconds_per_token += self.alpha * (cost - self.seconds_per_token)
+
+    def estimate(self, input_tokens):
+        """Expected generate time in seconds; None until something has been measured."""
+        if self.seconds_per_token is None:
+            return None
+        return input_tokens * self.seconds_per_token
+
+
+DECODE_COST = DecodeCost()
+
+
+def estimate_seconds(text):
+    return DECODE_COST.estimate(len(clean_text(text).split()) * TOKENS_PER_WORD)
+
+
+def extractive_summary(text, min_percent=30, max_percent=60):
+    """The TF-IDF summary on its own, for callers that can't wait for the model."""
+    min_percent, max_percent = normalise_percents(min_percent, max_percent)
+    return _tfidf_fallback(clean_text(text), min_percent, max_percent)
+
+
+
+#  ENCODER STATE REUSE
+#  Changing min/max percent on the paper page re-summarizes the same abstract; only the decoder
+#  depends on the length, so the tokenised input and encoder output are kept for recent abstracts.
+
+# Each entry is input tokens x 1024 floats (about 1.2 MB for a 300-token abstract)
+ENCODER_CACHE_SIZE = 16
+
+
+class EncoderCache:
+    """
+    LRU of (attention mask, encoder hidden states) per abstract text and model. Only plain
+    tensors are kept: generate() expands the encoder output it is given in place for beam
+    search, so every call gets a fresh BaseModelOutput around the shared tensors.
+    """
+
+    def __init__(self, max_entries=ENCODER_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, model, txt):
+        """Returns (generate kwargs, input tokens, whether the encoder run was reused)."""
+        key = (id(model), hashlib.sha1(txt.encode("utf-8")).hexdigest())
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+        if entry is not None:
+            return self._kwargs(*entry[:2]), entry[2], True
+
+        inputs = tokenizer(txt, return_tensors="pt", truncation=True, max_length=1024)
+        with torch.no_grad():
+            hidden = model.get_encoder()(
+                input_ids=inputs["input_ids"], attention_mask=inputs["attention_mask"], return_dict=True
+            ).last_hidden_state
+        entry = (inputs["attention_mask"], hidden, inputs["input_ids"].shape[1])
+
+        with self._lock:
+            self.misses += 1
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return self._kwargs(*entry[:2]), entry[2], False
+
+    @staticmethod
+    def _kwargs(attention_mask, hidden):
+        return {"attention_mask": attention_mask, "encoder_outputs": BaseModelOutput(last_hidden_state=hidden)}
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+ENCODER_CACHE = EncoderCache()
+
+
+def _model_inputs(summarizer, txt):
+    """generate() kwargs for one abstract; PyTorch models (fp32/int8) get cached encoder states instead of input ids."""
+    if isinstance(summarizer, torch.nn.Module):
+        return ENCODER_CACHE.get(summarizer, txt)
+    inputs = tokenizer(txt, return_tensors="pt", truncation=True, max_length=1024)
+    return dict(inputs), inputs["input_ids"].shape[1], False
+
+
+
+#  LENGTH SETTINGS
+
+def normalise_percents(min_percent, max_percent):
+    """Clamps the requested summary length to the range the model handles (also the summary cache key)."""
     try:
         min_percent, max_percent = int(min_percent), int(max_percent)
     except:
@@ -67,32 +342,63 @@ def summarize_text(text: str, min_percent: int = 30, max_percent: int = 60) -> s
 
     min_percent = max(5, min(80, min_percent))
     max_percent = max(min_percent + 5, min(90, max_percent))
+    return min_percent, max_percent
+
+
+
+#  MAIN SUMMARIZATION FUNCTION
+
+def summarize_text(text: str, min_percent: int = 30, max_percent: int = 60, budget=None) -> str:
+    return summarize_with_source(text, min_percent, max_percent, budget)[0]
+
+
+def summarize_with_source(text: str, min_percent: int = 30, max_percent: int = 60, budget=None):
+    """
+    Returns (summary, source); source is "model", "fallback" (TF-IDF), "deadline" (TF-IDF because the
+    estimated generate time exceeds `budget` seconds) or "none" (nothing to summarize).
+    """
+    txt = clean_text(text)
+    if not txt:
+        return "No abstract available to summarize.", "none"
+
+    total_words = len(txt.split())
+    if total_words < 20:
+        return f"Abstract too short ({total_words} words).", "none"
+
+    # validate input %
+    min_percent, max_percent = normalise_percents(min_percent, max_percent)
 
     print(f"SUMMARY SETTINGS: min={min_percent}%, max={max_percent}%, total_words={total_words}")
 
+    estimate = estimate_seconds(txt)
+    if budget is not None and estimate is not None and estimate > budget:
+        print(f"Estimated {estimate:.2f}s exceeds the {budget}s budget; using TF-IDF summarizer.")
+        return _tfidf_fallback(txt, min_percent, max_percent), "deadline"
+
     summarizer = _get_summarizer()
+    if summarizer and _needs_chunking(txt):
+        try:
+            return summarize_long(txt, min_percent, max_percent)
+        except Exception as e:
+            print(f"[WARN] Long-text summarization failed: {e}")
+            print("Falling back to TF-IDF summarizer.")
+            return _tfidf_fallback(txt, min_percent, max_percent), "fallback"
 
     
-    #  FIXED TOKENIZATION
+    #  TOKENIZATION + ENCODER (reused across length settings of the same abstract)
     
-    inputs = tokenizer(
-        txt,
-        return_tensors="pt",
-        truncation=True,
-        max_length=1024
-    )
+    start = time.perf_counter()
+    inputs, input_tokens, reused = _model_inputs(summarizer, txt)
 
     # PRINT NUMBER OF INPUT TOKENS
-    input_tokens = inputs["input_ids"].shape[1]
-    print(f"INPUT TOKENS: {input_tokens}")
+    print(f"INPUT TOKENS: {input_tokens}{' (cached encoder states)' if reused else ''}")
 
     
     #  CASE 1: Model available
     
     if summarizer:
         try:
-            min_tokens = max(25, int(input_tokens * (min_percent / 100.0)))
-            max_tokens = max(min_tokens + 10, round(input_tokens * (max_percent / 100.0)))
+            min_tokens, max_tokens = _token_budget(input_tokens, min_percent, max_percent)
 
             print(f"Using model summarizer: min_tokens={min_tokens}, max_tokens={max_tokens}")
 
@@ -100,17 +406,11 @@ def summarize_text(text: str, min_percent: int = 30, max_percent: int = 60) -> s
                 **inputs,
                 min_length=min_tokens,
                 max_length=max_tokens,
-
-                #  ENABLE SAMPLING — REQUIRED for DistilBART to change length
-                do_sample=True,
-                #top_p=0.90,
-                temperature=0.85,
-
-                # encourage longer output
-                length_penalty=10,#9,
-                #no_repeat_ngram_size=3,
-                early_stopping=False
+                **GENERATE_OPTIONS,
             )
+            if not reused:
+                # Decoder-only runs would understate the cost of a new abstract
+                DECODE_COST.observe(time.perf_counter() - start, input_tokens)
 
             output_tokens = len(summary_ids[0])
             print(f"OUTPUT TOKENS: {output_tokens}")
@@ -125,7 +425,7 @@ def summarize_text(text: str, min_percent: int = 30, max_percent: int = 60) -> s
                 raise ValueError("Empty model summary")
 
             print("Model summarization successful.")
-            return summary
+            return summary, "model"
 
         except Exception as e:
             print(f"[WARN] Model summarization failed: {e}")
@@ -134,4 +434,224 @@ def summarize_text(text: str, min_percent: int = 30, max_percent: int = 60) -> s
     #  CASE 2: Fallback mode
     
     print("Falling back to TF-IDF summarizer.")
-    return _tfidf_fallback(txt, min_percent, max_percent)
+    return _tfidf_fallback(txt, min_percent, max_percent), "fallback"
+
+
+
+#  STREAMED SUMMARIZATION (paper page)
+
+# Longest wait for the next piece before the stream gives up on the model
+STREAM_TIMEOUT = 60
+
+
+class _Cancelled(StoppingCriteria):
+    """Stops generate() once `event` is set (every viewer of the stream has gone)."""
+
+    def __init__(self, event):
+        self.event = event
+
+    def __call__(self, input_ids, scores, **kwargs):
+        return torch.full((input_ids.shape[0],), self.event.is_set(), dtype=torch.bool, device=input_ids.device)
+
+
+class SummaryStream:
+    """
+    Iterates over a summary as DistilBART decodes it, piece by piece; afterwards `summary`
+    and `source` hold the result like summarize_with_source. Text the model doesn't handle
+    (too short, model unavailable) comes back as a single piece; a failed or cancelled
+    generation ends with the TF-IDF summary as `summary`, so callers should show that once
+    iteration ends. Setting `cancel` stops the model at its next decoding step.
+    """
+
+    def __init__(self, text: str, min_percent: int = 30, max_percent: int = 60, cancel=None):
+        self.text = clean_text(text)
+        self.min_percent, self.max_percent = normalise_percents(min_percent, max_percent)
+        self.cancel = cancel or threading.Event()
+        self.summary, self.source = None, None
+
+    def __iter__(self):
+        summarizer = _get_summarizer() if len(self.text.split()) >= 20 else None
+        if summarizer is None or _needs_chunking(self.text):
+            # Map-reduce output only exists once the last pass is done, so it comes as one piece
+            self.summary, self.source = summarize_with_source(self.text, self.min_percent, self.max_percent)
+            yield self.summary
+            return
+
+        inputs, input_tokens, _ = _model_inputs(summarizer, self.text)
+        min_tokens, max_tokens = _token_budget(input_tokens, self.min_percent, self.max_percent)
+        streamer = TextIteratorStreamer(tokenizer, skip_special_tokens=True, timeout=STREAM_TIMEOUT)
+        errors = []
+
+        def generate():
+            try:
+                summarizer.generate(
+                    **inputs,
+                    min_length=min_tokens,
+                    max_length=max_tokens,
+                    streamer=streamer,
+                    stopping_criteria=StoppingCriteriaList([_Cancelled(self.cancel)]),
+                    **GENERATE_OPTIONS,
+                    num_beams=1,  # streamers need a single sequence; DistilBART's config asks for 4 beams
+                )
+            except Exception as e:
+                errors.append(e)
+                streamer.end()
+
+        threading.Thread(target=generate, name="summary-stream", daemon=True).start()
+        pieces = []
+        try:
+            for piece in streamer:
+                if piece:
+                    pieces.append(piece)
+                    yield piece
+        except queue.Empty:
+            errors.append(TimeoutError(f"no output for {STREAM_TIMEOUT}s"))
+
+        summary = "".join(pieces).strip()
+        if self.cancel.is_set():
+            errors.append("cancelled")
+        if errors or not summary:
+            print(f"[WARN] Streamed summarization failed: {errors[0] if errors else 'empty summary'}")
+            self.summary, self.source = _tfidf_fallback(self.text, self.min_percent, self.max_percent), "fallback"
+        else:
+            self.summary, self.source = summary, "model"
+
+
+
+#  BATCHED SUMMARIZATION (corpus backfill)
+
+def summarize_batch(texts, min_percent: int = 30, max_percent: int = 60, chunk_long=True):
+    """
+    Summarizes several abstracts with one padded generate call; returns [(summary, source)] in input order.
+    Texts should be of similar length (sort before batching): the batch shares one token budget,
+    computed from its mean input length. Texts over the encoder window go through summarize_long,
+    unless `chunk_long` is False (the windows of summarize_long itself), when they are truncated.
+    """
+    results = [None] * len(texts)
+    pending = []
+    for i, text in enumerate(texts):
+        txt = clean_text(text)
+        if len(txt.split()) < 20:
+            results[i] = summarize_with_source(txt, min_percent, max_percent)
+        else:
+            pending.append((i, txt))
+    if not pending:
+        return results
+
+    min_percent, max_percent = normalise_percents(min_percent, max_percent)
+    summarizer = _get_summarizer()
+    for i, txt in pending:
+        if chunk_long and _needs_chunking(txt):
+            results[i] = summarize_long(txt, min_percent, max_percent)
+    pending = [(i, txt) for i, txt in pending if results[i] is None]
+    if not pending:
+        return results
+
+    inputs = tokenizer(
+        [txt for _, txt in pending],
+        return_tensors="pt",
+        padding=True,
+        truncation=True,
+        max_length=1024
+    )
+    input_tokens = int(inputs["attention_mask"].sum(dim=1).float().mean())
+    min_tokens, max_tokens = _token_budget(input_tokens, min_percent, max_percent)
+
+    try:
+        summary_ids = summarizer.generate(
+            **inputs,
+            min_length=min_tokens,
+            max_length=max_tokens,
+            **GENERATE_OPTIONS,
+        )
+        summaries = [summary.strip() for summary in tokenizer.batch_decode(summary_ids, skip_special_tokens=True)]
+    except Exception as e:
+        print(f"[WARN] Batched summarization failed: {e}")
+        summaries = [""] * len(pending)
+
+    fallbacks = iter(extractive_batch([txt for (_, txt), summary in zip(pending, summaries) if not summary], min_percent, max_percent))
+    for (i, txt), summary in zip(pending, summaries):
+        results[i] = (summary, "model") if summary else (next(fallbacks), "fallback")
+    return results
+
+
+
+#  LONG TEXTS (map-reduce over the 1024-token encoder window)
+#  Sentence windows are summarized as padded batches (map), then the joined partial summaries
+#  are summarized once more (reduce) to fuse them and drop what the window overlap repeated.
+
+MAX_INPUT_TOKENS = 1024
+CHUNK_TOKENS = 900          # leaves room for special tokens
+CHUNK_OVERLAP_SENTENCES = 1
+CHUNK_BATCH = 4             # windows per generate call
+MAX_CHUNKS = 16             # model windows per text; windows past the cap are summarized with TF-IDF
+REDUCE_PERCENTS = (60, 90)  # the partials are already at the requested length
+
+
+def _needs_chunking(txt):
+    # Word count first, so abstracts of ordinary length are never tokenised twice
+    if len(txt.split()) * TOKENS_PER_WORD <= MAX_INPUT_TOKENS * 0.75:
+        return False
+    return len(tokenizer(txt)["input_ids"]) > MAX_INPUT_TOKENS
+
+
+def _split_long_sentences(sentences, ids, chunk_tokens=CHUNK_TOKENS):
+    """
+    Cuts every sentence longer than chunk_tokens into pieces of chunk_tokens token ids (text with
+    no sentence boundary, e.g. newline-separated lines, is one long "sentence").
+    Returns the sentences and their token lengths.
+    """
+    pieces, lengths = [], []
+    for sentence, sentence_ids in zip(sentences, ids):
+        if len(sentence_ids) <= chunk_tokens:
+            pieces.append(sentence)
+            lengths.append(len(sentence_ids))
+            continue
+        for start in range(0, len(sentence_ids), chunk_tokens):
+            piece = sentence_ids[start:start + chunk_tokens]
+            pieces.append(tokenizer.decode(piece, skip_special_tokens=True).strip())
+            lengths.append(len(piece))
+    return pieces, lengths
+
+
+def _chunk_sentences(sentences, lengths, chunk_tokens=CHUNK_TOKENS, overlap=CHUNK_OVERLAP_SENTENCES):
+    """Greedy windows of whole sentences up to chunk_tokens; each repeats the last `overlap` sentences of the one before."""
+    chunks, start = [], 0
+    while start < len(sentences):
+        stop, size = start, 0
+        while stop < len(sentences) and (stop == start or size + lengths[stop] <= chunk_tokens):
+            size += lengths[stop]
+            stop += 1
+        chunks.append(" ".join(sentences[start:stop]))
+        if stop == len(sentences):
+            break
+        start = max(start + 1, stop - overlap)
+    return chunks
+
+
+def summarize_long(txt, min_percent: int = 30, max_percent: int = 60):
+    """(summary, source) of a text longer than the encoder window, in about linear time in its length."""
+    min_percent, max_percent = normalise_percents(min_percent, max_percent)
+    sentences = [sentence for sentence in _split_sentences(txt) if sentence.strip()]
+    sentences, lengths = _split_long_sentences(sentences, tokenizer(sentences, add_special_tokens=False)["input_ids"])
+    chunks = _chunk_sentences(sentences, lengths)
+    print(f"LONG INPUT: {sum(lengths)} tokens in {len(chunks)} windows")
+
+    # MAP
+    partials = []
+    modelled = chunks[:MAX_CHUNKS]
+    for i in range(0, len(modelled), CHUNK_BATCH):
+        partials += summarize_batch(modelled[i:i + CHUNK_BATCH], min_percent, max_percent, chunk_long=False)
+    partials += [(summary, "fallback") for summary in extractive_batch(chunks[MAX_CHUNKS:], min_percent, max_percent)]
+    # A window too short to summarize (usually the last) goes into the reduce pass as it is
+    partials = [(chunk, "model") if source == "none" else (summary, source) for chunk, (summary, source) in zip(chunks, partials)]
+    source = "model" if all(source == "model" for _, source in partials) else "fallback"
+    joined = " ".join(summary for summary, _ in partials)
+
+    # REDUCE (when the partials fit one window; otherwise they are returned in order)
+    if len(partials) > 1 and not _needs_chunking(joined):
+        summary, reduce_source = summarize_with_source(joined, *REDUCE_PERCENTS)
+        if reduce_source == "model":
+            return summary, source
+    return joined, source
+
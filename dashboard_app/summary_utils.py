@@ -0,0 +1,453 @@
+import json
+import threading
+import time
+from collections import Counter, OrderedDict
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+from django.conf import settings
+from django.db import connection
+from django.http import JsonResponse, StreamingHttpResponse
+from .models import Papers, Paper_Summary
+from . import summarize_utils, inference_utils
+
+
+# Summaries kept in memory per process, in front of the Paper_Summary table
+SUMMARY_CACHE_SIZE = 1024
+
+# Background generation: request threads only queue work, these threads run the model
+SUMMARY_WORKERS = 1
+
+
+class _Flight:
+    """One in-progress generation that other requests for the same key wait on."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.summary = None
+        self.error = None
+
+
+class _StreamFlight:
+    """
+    One streamed generation, shared by every viewer of the same summary. Pieces are kept so a
+    viewer who joins late starts from the beginning; the model stops when the last viewer
+    disconnects, unless a viewer handed over to polling (`keep`).
+    """
+
+    def __init__(self):
+        self.pieces = []
+        self.summary, self.source = None, None
+        self.done = False
+        self.viewers = 0
+        self.keep = False
+        self.cancel = threading.Event()
+        self._changed = threading.Condition()
+
+    def push(self, piece):
+        with self._changed:
+            self.pieces.append(piece)
+            self._changed.notify_all()
+
+    def finish(self, summary, source):
+        with self._changed:
+            self.summary, self.source, self.done = summary, source, True
+            self._changed.notify_all()
+
+    def follow(self, seconds):
+        """Yields the pieces so far, then new ones as they arrive, until done or `seconds` have passed."""
+        deadline, seen = time.monotonic() + seconds, 0
+        while True:
+            with self._changed:
+                while seen == len(self.pieces) and not self.done:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        return
+                    self._changed.wait(remaining)
+                pieces, done = self.pieces[seen:], self.done
+            seen += len(pieces)
+            yield from pieces
+            if done:
+                return
+
+
+class SummaryStore:
+    """
+    Generated summaries keyed by (doi, min_percent, max_percent, model id).
+    Lookups go LRU -> Paper_Summary table -> model. Concurrent misses for one key share
+    a single generation (single flight); only model output is kept (in memory and the table), so a TF-IDF
+    fallback is retried on the next cold lookup instead of being stored for good.
+    """
+
+    def __init__(self, max_entries=SUMMARY_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._flights = {}
+        self._queued = {}
+        self._streams = {}
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def key(self, doi, min_percent, max_percent):
+        min_percent, max_percent = summarize_utils.normalise_percents(min_percent, max_percent)
+        return doi, min_percent, max_percent, summarize_utils.model_id()
+
+    # --- LRU ---
+    def _remember(self, key, summary):
+        with self._lock:
+            self._entries[key] = summary
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def cached(self, key):
+        """Summary from memory or the table, without generating; None on a miss."""
+        with self._lock:
+            summary = self._entries.get(key)
+            if summary is not None:
+                self._entries.move_to_end(key)
+                return summary
+
+        doi, min_percent, max_percent, model_id = key
+        summary = Paper_Summary.objects.filter(
+            doi_id=doi, min_percent=min_percent, max_percent=max_percent, model_id=model_id
+        ).values_list("summary", flat=True).first()
+        if summary is not None:
+            self._remember(key, summary)
+        return summary
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            # Finished background results are cache entries too; running ones are left alone
+            self._queued = {key: future for key, future in self._queued.items() if not future.done()}
+
+    # --- Generation ---
+    def _generate(self, key, abstract):
+        doi, min_percent, max_percent, model_id = key
+        summary, source = inference_utils.summarize(abstract, min_percent, max_percent)
+        self.save(key, summary, source)
+        return summary
+
+    def save(self, key, summary, source):
+        """
+        Stores a summary generated here or elsewhere (e.g. streamed). Only model output is
+        kept, in memory and in the table; fallback and deadline summaries are retried next time.
+        """
+        if source != "model":
+            return
+        doi, min_percent, max_percent, model_id = key
+        Paper_Summary.objects.bulk_create(
+            [Paper_Summary(doi_id=doi, min_percent=min_percent, max_percent=max_percent, model_id=model_id, summary=summary)],
+            ignore_conflicts=True,  # another worker process may have stored it first
+        )
+        self._remember(key, summary)
+
+    def get(self, paper, min_percent=30, max_percent=60):
+        key = self.key(paper.doi, min_percent, max_percent)
+        summary = self.cached(key)
+        if summary is not None:
+            return summary
+
+        with self._lock:
+            # A flight may have finished while we were reading the table
+            if key in self._entries:
+                return self._entries[key]
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.summary
+
+        try:
+            flight.summary = self._generate(key, paper.abstract)
+            return flight.summary
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                self._flights.pop(key, None)
+            flight.done.set()
+
+
+    # --- Background generation ---
+    def _submit(self, fn, *args):
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=SUMMARY_WORKERS, thread_name_prefix="summary")
+        return self._executor.submit(fn, *args)
+
+    def _generate_in_background(self, paper, min_percent, max_percent):
+        try:
+            return self.get(paper, min_percent, max_percent)
+        finally:
+            connection.close()  # worker threads must not keep their own connection open
+
+    def request(self, paper, min_percent=30, max_percent=60):
+        """
+        Non-blocking lookup: returns ("ready", summary), or queues a generation and returns
+        ("pending", None). A failed generation is reported once as ("error", None) and retried on the next request.
+        """
+        key = self.key(paper.doi, min_percent, max_percent)
+        summary = self.cached(key)
+        if summary is not None:
+            self._drop_finished(key)
+            return "ready", summary
+
+        with self._lock:
+            if key in self._streams:
+                return "pending", None  # being streamed; stored when it finishes
+            future = self._queued.get(key)
+            if future is not None and future.done():
+                del self._queued[key]
+                if future.exception() is not None:
+                    return "error", None
+                return "ready", future.result()
+            if future is None:
+                self._queued[key] = self._submit(self._generate_in_background, paper, min_percent, max_percent)
+        return "pending", None
+
+    def wait(self, key, timeout):
+        """Waits up to `timeout` seconds for a queued generation; None if it has not finished by then."""
+        with self._lock:
+            future = self._queued.get(key)
+        if future is None:
+            return self.cached(key)
+        try:
+            summary = future.result(timeout=timeout)
+        except TimeoutError:
+            return None
+        except Exception:
+            self._drop_finished(key)  # retried on the next request
+            raise
+        self._drop_finished(key)
+        return summary
+
+    # --- Streamed generation ---
+    def stream(self, paper, min_percent=30, max_percent=60):
+        """
+        Joins the streamed generation of a summary, starting it on the background executor if
+        no viewer has yet; returns the _StreamFlight to follow, or None when a non-streamed
+        generation of the same summary is already queued. Pair every flight with leave().
+        """
+        key = self.key(paper.doi, min_percent, max_percent)
+        with self._lock:
+            future = self._queued.get(key)
+            if future is not None and not future.done():
+                return None
+            flight = self._streams.get(key)
+            if flight is None or flight.cancel.is_set():  # a cancelled flight is winding down; start afresh
+                flight = self._streams[key] = _StreamFlight()
+                self._submit(self._stream_in_background, key, flight, paper.abstract, min_percent, max_percent)
+            flight.viewers += 1
+        return flight
+
+    def leave(self, flight, keep=False):
+        """A viewer stops following; `keep` lets generation finish for polling after the last one leaves."""
+        with self._lock:
+            flight.viewers -= 1
+            flight.keep = flight.keep or keep
+            if flight.viewers == 0 and not flight.keep:
+                flight.cancel.set()
+
+    def _stream_in_background(self, key, flight, abstract, min_percent, max_percent):
+        summary, source = None, "fallback"
+        try:
+            stream = summarize_utils.SummaryStream(abstract, min_percent, max_percent, cancel=flight.cancel)
+            for piece in stream:
+                flight.push(piece)
+            summary, source = stream.summary, stream.source
+            self.save(key, summary, source)
+        except Exception as e:
+            print(f"[WARN] Streamed summarization failed: {e}")
+            summary = summary or summarize_utils.extractive_summary(abstract, min_percent, max_percent)
+        finally:
+            with self._lock:
+                if self._streams.get(key) is flight:
+                    del self._streams[key]
+            flight.finish(summary, source)
+            connection.close()  # worker threads must not keep their own connection open
+
+    def _drop_finished(self, key):
+        """Forgets a finished background generation once its result has been read or remembered."""
+        with self._lock:
+            future = self._queued.get(key)
+            if future is not None and future.done():
+                del self._queued[key]
+
+
+class PathCounters:
+    """How often each path served a deadline-bound summary, per process."""
+
+    def __init__(self):
+        self._counts = Counter()
+        self._lock = threading.Lock()
+
+    def record(self, path):
+        with self._lock:
+            self._counts[path] += 1
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self._counts)
+
+    def clear(self):
+        with self._lock:
+            self._counts.clear()
+
+
+SUMMARY_STORE = SummaryStore()
+SUMMARY_PATHS = PathCounters()
+
+
+def Get_Summary(paper, min_percent=30, max_percent=60):
+    return SUMMARY_STORE.get(paper, min_percent, max_percent)
+
+
+def Request_Summary(paper, min_percent=30, max_percent=60):
+    return SUMMARY_STORE.request(paper, min_percent, max_percent)
+
+
+def Cached_Summary(paper, min_percent=30, max_percent=60):
+    return SUMMARY_STORE.cached(SUMMARY_STORE.key(paper.doi, min_percent, max_percent))
+
+
+def Streaming_Enabled():
+    """Streams need the model in this process; behind the inference server pages use Summarize_Within."""
+    return settings.SUMMARY_STREAMING and not settings.SUMMARY_SERVER_SOCKET
+
+
+def Summarize_Within(paper, min_percent=30, max_percent=60, budget=None):
+    """
+    Returns (summary, status) within about `budget` seconds (SUMMARY_LATENCY_BUDGET by default).
+    The model summary is returned ("ready") when it is cached or generated in time; otherwise the
+    TF-IDF summary comes back at once ("pending") while the model one keeps generating for later.
+    Generation is skipped up front when the measured per-token cost says it cannot finish in time.
+    """
+    budget = settings.SUMMARY_LATENCY_BUDGET if budget is None else budget
+    key = SUMMARY_STORE.key(paper.doi, min_percent, max_percent)
+    summary = SUMMARY_STORE.cached(key)
+    if summary is not None:
+        SUMMARY_PATHS.record("cached")
+        return summary, "ready"
+
+    status, summary = SUMMARY_STORE.request(paper, min_percent, max_percent)
+    if status == "ready":
+        SUMMARY_PATHS.record("model")
+        return summary, "ready"
+
+    estimate = summarize_utils.estimate_seconds(paper.abstract)
+    if status == "pending":
+        if estimate is not None and estimate > budget:
+            SUMMARY_PATHS.record("deadline")
+            return summarize_utils.extractive_summary(paper.abstract, min_percent, max_percent), "pending"
+        try:
+            summary = SUMMARY_STORE.wait(key, budget)
+        except Exception:
+            status = "error"
+        else:
+            if summary is not None:
+                SUMMARY_PATHS.record("model")
+                return summary, "ready"
+            SUMMARY_PATHS.record("timeout")
+            return summarize_utils.extractive_summary(paper.abstract, min_percent, max_percent), "pending"
+
+    # The model failed: serve the extractive summary; the next request tries the model again
+    SUMMARY_PATHS.record("error")
+    return summarize_utils.extractive_summary(paper.abstract, min_percent, max_percent), "ready"
+
+
+def Summary_Stats(request):
+    """Deadline-path counters of this worker and its measured decode cost: /api/summary/stats"""
+    return JsonResponse({
+        "paths": SUMMARY_PATHS.snapshot(),
+        "seconds_per_token": summarize_utils.DECODE_COST.seconds_per_token,
+        "budget": settings.SUMMARY_LATENCY_BUDGET,
+    })
+
+
+def _requested_paper(request):
+    """(paper, None) for the ?doi= of a summary API call, or (None, error response)."""
+    doi = request.GET.get("doi")
+    if not doi:
+        return None, JsonResponse({"error": "doi is required"}, status=400)
+    paper = Papers.objects.defer("search_vector").filter(doi=doi).first()
+    if paper is None:
+        return None, JsonResponse({"error": "paper not found"}, status=404)
+    return paper, None
+
+
+def Summary_Api(request):
+    """Summary status of a paper: /api/summary?doi=&min_percent=&max_percent= -> pending / ready"""
+    paper, error = _requested_paper(request)
+    if error:
+        return error
+    if not paper.abstract:
+        return JsonResponse({"status": "ready", "summary": ""})
+
+    status, summary = Request_Summary(paper, request.GET.get("min_percent", 30), request.GET.get("max_percent", 60))
+    return JsonResponse({"status": status, "summary": summary}, status=500 if status == "error" else 200)
+
+
+def _sse(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+def Summary_Stream_Api(request):
+    """
+    Server-sent events for a summary as it is generated: /api/summary/stream?doi=&min_percent=&max_percent=
+    "token" events carry the next piece of text; the final "done" event carries the whole summary
+    (which replaces the pieces: a failed generation ends with the TF-IDF summary). Generation runs on
+    the store's background threads, shared by everyone viewing the paper; after SUMMARY_STREAM_SECONDS
+    the stream ends with a "pending" event, freeing the web thread, and the page polls /api/summary.
+    """
+    paper, error = _requested_paper(request)
+    if error:
+        return error
+    min_percent, max_percent = request.GET.get("min_percent", 30), request.GET.get("max_percent", 60)
+    key = SUMMARY_STORE.key(paper.doi, min_percent, max_percent)
+
+    def events():
+        summary = SUMMARY_STORE.cached(key) if paper.abstract else ""
+        if summary is not None:
+            SUMMARY_PATHS.record("cached")
+            yield _sse("done", {"summary": summary, "source": "cache"})
+            return
+
+        flight = SUMMARY_STORE.stream(paper, min_percent, max_percent) if Streaming_Enabled() else None
+        if flight is None:
+            # Behind the inference server (or already generating): no pieces, just the finished summary
+            status, summary = SUMMARY_STORE.request(paper, min_percent, max_percent)
+            if status == "pending":
+                try:
+                    summary = SUMMARY_STORE.wait(key, settings.SUMMARY_STREAM_SECONDS)
+                except Exception:
+                    summary = None  # polling reports the error and retries
+            if summary is None:
+                yield _sse("pending", {})
+                return
+            SUMMARY_PATHS.record("stream")
+            yield _sse("done", {"summary": summary, "source": "background"})
+            return
+
+        followed = False
+        try:
+            for piece in flight.follow(settings.SUMMARY_STREAM_SECONDS):
+                yield _sse("token", {"text": piece})
+            followed = True
+        finally:
+            # Closed early (the client went away): the last viewer to go stops the model
+            SUMMARY_STORE.leave(flight, keep=followed)
+        if not flight.done:
+            yield _sse("pending", {})
+            return
+        SUMMARY_PATHS.record("stream")
+        yield _sse("done", {"summary": flight.summary, "source": flight.source})
+
+    response = StreamingHttpResponse(events(), content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"  # let nginx pass events through as they come
+    return response
@@ -1,7 +1,24 @@
-from django.test import TestCase
-from .models import Papers, Authors, Users, Keywords, Author_Papers, Researcher, Users_Keywords, Keywords_Paper
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.db import connection
+from django.core.signals import request_finished
+from django.contrib.postgres.search import SearchQuery
+from .models import Papers, Authors, Users, Keywords, Author_Papers, Researcher, Users_Keywords, Keywords_Paper, Papers_Year, Keywords_Year, Paper_Summary, Paper_Embedding
 from .const import Config
+from . import rollup_utils, home_utils, analytics_utils, search_utils, embedding_utils, suggest_utils, summarize_utils, summary_utils, inference_utils, model_utils
 from datetime import date
+from unittest import mock
+import numpy as np
+import base64
+import threading
+import tempfile
+import asyncio
+import time
+import io
+import os
+from django.core.management import call_command
+from django.core.exceptions import ImproperlyConfigured
+import torch
 
 
 class PapersModelTest(TestCase):
@@ -106,3 +123,1217 @@ class RelationsTest(TestCase):
         rel = Researcher.objects.create(user_id=self.user, author_id=self.author)
         self.assertEqual(rel.user_id.username, "bob123")
         self.assertEqual(rel.author_id.name, "John Doe")
+
+
+class RollupTest(TestCase):
+    def setUp(self):
+        self.keyword = Keywords.objects.create(id="kd1", keyword="graph neural networks")
+        self.papers = [
+            Papers.objects.create(
+                doi=f"10.1234/rollup-{i}",
+                title=f"Rollup Paper {i}",
+                publishing_year=2020 + (i % 2),
+                abstract="Testing rollups",
+                citations_count=i,
+                link=f"https://example.com/rollup-{i}"
+            )
+            for i in range(3)
+        ]
+
+    def test_incremental_matches_rebuild(self):
+        rollup_utils.record_papers([p.publishing_year for p in self.papers])
+        for paper in self.papers:
+            Keywords_Paper.objects.create(doi=paper, keyword_id=self.keyword)
+        rollup_utils.record_keyword_links((self.keyword.id, p.publishing_year) for p in self.papers)
+
+        incremental = (
+            sorted(Papers_Year.objects.values_list("publishing_year", "paper_count")),
+            sorted(Keywords_Year.objects.values_list("keyword_id", "publishing_year", "paper_count")),
+        )
+        rollup_utils.rebuild_rollups()
+        rebuilt = (
+            sorted(Papers_Year.objects.values_list("publishing_year", "paper_count")),
+            sorted(Keywords_Year.objects.values_list("keyword_id", "publishing_year", "paper_count")),
+        )
+
+        self.assertEqual(incremental, rebuilt)
+        self.assertEqual(rebuilt[0], [(2020, 2), (2021, 1)])
+        self.assertEqual(rebuilt[1], [("kd1", 2020, 2), ("kd1", 2021, 1)])
+
+
+    def test_insert_new_returns_only_own_inserts(self):
+        links = lambda: [Keywords_Paper(doi=paper, keyword_id=self.keyword) for paper in self.papers[:2]]
+        self.assertEqual(
+            rollup_utils.insert_new(Keywords_Paper, links(), ["doi"]),
+            {("10.1234/rollup-0",), ("10.1234/rollup-1",)},
+        )
+        self.assertEqual(rollup_utils.insert_new(Keywords_Paper, links(), ["doi"]), set())  # already linked
+        self.assertEqual(Keywords_Paper.objects.count(), 2)
+
+        paper = Papers(doi="10.1234/rollup-new", title="New", publishing_year=2022, abstract="Searchable words",
+                       citations_count=0, link="https://example.com", paper_type="journal-article")
+        self.assertEqual(rollup_utils.insert_new(Papers, [paper, self.papers[0]], ["doi"]), {("10.1234/rollup-new",)})
+        self.assertTrue(Papers.objects.filter(search_vector="searchable").exists())  # trigger still fills it
+
+
+class ChartCacheTest(TestCase):
+    def setUp(self):
+        keyword = Keywords.objects.create(id="kd1", keyword="computer vision")
+        for i in range(3):
+            paper = Papers.objects.create(
+                doi=f"10.1234/chart-{i}",
+                title=f"Chart Paper {i}",
+                publishing_year=2021 + i,
+                abstract="Testing charts",
+                citations_count=i,
+                link=f"https://example.com/chart-{i}"
+            )
+            Keywords_Paper.objects.create(doi=paper, keyword_id=keyword)
+        rollup_utils.rebuild_rollups()
+        home_utils.CHART_CACHE.clear()
+        analytics_utils.reset_served_epoch()
+
+    def test_charts_rendered_once_per_epoch(self):
+        with mock.patch.object(home_utils, "_figure_to_base64", return_value="png") as render:
+            self.client.get("/?charts=png")
+            self.assertEqual(render.call_count, 3)
+
+            self.client.get("/?charts=png")
+            self.assertEqual(render.call_count, 3)
+
+            rollup_utils.bump_epoch()
+            self.client.get("/?charts=png")
+            self.assertEqual(render.call_count, 3)  # within TOPIC_REFRESH_SECONDS of the last epoch
+
+            with mock.patch.object(analytics_utils, "TOPIC_REFRESH_SECONDS", 0):
+                self.client.get("/?charts=png")
+            self.assertEqual(render.call_count, 6)
+
+    def test_home_draws_charts_in_browser(self):
+        with mock.patch.object(home_utils, "_figure_to_base64") as render:
+            response = self.client.get("/")
+        render.assert_not_called()
+        self.assertContains(response, 'id="dashboard-series"')
+
+    def test_series_api(self):
+        response = self.client.get("/api/dashboard/series?min_year=2022&max_year=2023")
+        self.assertEqual(response.status_code, 200)
+        series = response.json()
+        self.assertEqual(series["yearly"], {"years": [2021, 2022, 2023], "counts": [1, 1, 1]})
+        self.assertEqual(series["topics"], {"labels": ["computer vision"], "counts": [2]})
+        self.assertEqual(series["trends"]["years"], [2022, 2023])
+        self.assertEqual(series["trends"]["cumulative"], [[1, 2]])
+
+        response = self.client.get("/api/dashboard/series?min_year=abc")
+        self.assertEqual(response.status_code, 400)
+
+    def test_series_range_is_clamped_to_the_data(self):
+        response = self.client.get("/api/dashboard/series?min_year=1&max_year=1000000000")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["trends"]["years"], [2021, 2022, 2023])
+
+        response = self.client.get("/api/dashboard/series?min_year=0&max_year=2022")
+        self.assertEqual(response.json()["trends"]["years"], [2021, 2022])
+
+        self.assertEqual(self.client.get("/api/dashboard/series?min_year=2023&max_year=2022").status_code, 400)
+        self.assertEqual(self.client.get("/?min_year=2023&max_year=2022").status_code, 400)
+
+
+class HomeQueryCountTest(TestCase):
+    def add_papers(self, start, count):
+        keywords = [Keywords.objects.get_or_create(id=f"kd{i}", keyword=f"topic {i}")[0] for i in range(15)]
+        for i in range(start, start + count):
+            paper = Papers.objects.create(
+                doi=f"10.1234/count-{i}",
+                title=f"Count Paper {i}",
+                publishing_year=2000 + i % 20,
+                abstract="Testing query counts",
+                citations_count=i,
+                link=f"https://example.com/count-{i}"
+            )
+            for keyword in keywords[i % 15:i % 15 + 3]:
+                Keywords_Paper.objects.create(doi=paper, keyword_id=keyword)
+        rollup_utils.rebuild_rollups()
+        home_utils.CHART_CACHE.clear()
+        analytics_utils.reset_served_epoch()
+
+    def count_home_queries(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get("/?min_year=2005&max_year=2015")
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def test_query_count_independent_of_corpus_size(self):
+        self.add_papers(0, 20)
+        small = self.count_home_queries()
+        self.add_papers(20, 200)
+        large = self.count_home_queries()
+        self.assertEqual(small, large)
+
+
+class TopicMatrixTest(TestCase):
+    def setUp(self):
+        # kd1: 2019 -> 1, 2021 -> 4 / kd2: 2019 -> 3 / kd3: 2021 -> 2 (no papers at all in 2020)
+        self.matrix = analytics_utils.TopicMatrix(
+            ["kd1", "kd2", "kd3"], [2019, 2021], [[1, 4], [3, 0], [0, 2]]
+        )
+
+    def test_top_n_and_share(self):
+        rows, counts = self.matrix.top_n(2, 2019, 2021)
+        self.assertEqual(self.matrix.keyword_ids[rows].tolist(), ["kd1", "kd2"])
+        self.assertEqual(counts.tolist(), [5, 3])
+        self.assertAlmostEqual(self.matrix.share_of_total(2019, 2021)[0], 0.5)
+
+    def test_topics_without_papers_in_range_are_not_ranked(self):
+        matrix = analytics_utils.TopicMatrix(
+            ["d", "c", "b", "a"], [2015, 2016, 2020], [[0, 0, 1], [0, 0, 2], [0, 0, 1], [5, 0, 0]]
+        )
+        rows, counts = matrix.top_n(10, 2016, 2020)
+        self.assertEqual(matrix.keyword_ids[rows].tolist(), ["c", "b", "d"])  # tie between b and d broken by id
+        self.assertEqual(counts.tolist(), [2, 1, 1])
+        self.assertEqual(matrix.keyword_ids[matrix.top_n(2, 2016, 2020)[0]].tolist(), ["c", "b"])
+        self.assertEqual(matrix.trending(2016, 10).tolist(), [])
+
+    def test_built_from_the_ranked_year_slice(self):
+        for keyword_id, year, count in [("kd1", 2019, 1), ("kd1", 2021, 4), ("kd2", 2019, 3), ("kd3", 2021, 2), ("kd4", 2018, 9)]:
+            keyword = Keywords.objects.get_or_create(id=keyword_id, keyword=keyword_id)[0]
+            Keywords_Year.objects.create(keyword_id=keyword, publishing_year=year, paper_count=count)
+
+        matrix = analytics_utils.TopicMatrix.from_rollup(2019, 2021, top_n=1)
+        self.assertEqual(matrix.keyword_ids.tolist(), ["kd1"])  # top overall and top in 2021
+        self.assertEqual(matrix.range_total, 10)  # kd4 is outside the range
+        matrix = analytics_utils.TopicMatrix.from_rollup(2019, 2021)
+        self.assertEqual(matrix.counts.tolist(), self.matrix.counts.tolist())
+
+    def test_trending_and_cumulative(self):
+        rows = self.matrix.trending(2021, 2)
+        self.assertEqual(self.matrix.keyword_ids[rows].tolist(), ["kd1", "kd3"])
+        self.assertEqual(self.matrix.cumulative(rows, 2019, 2021).tolist(), [[1, 1, 5], [0, 0, 2]])
+        self.assertEqual(self.matrix.year_over_year(rows, 2020, 2021).tolist(), [[-1, 4], [0, 2]])
+
+
+class FullTextSearchTest(TestCase):
+    def setUp(self):
+        search_utils.SEARCH_CACHE.clear()
+        Papers.objects.create(
+            doi="10.1234/fts-title",
+            title="Graph neural networks for molecules",
+            publishing_year=2022,
+            abstract="We study message passing on chemical graphs.",
+            citations_count=5,
+            link="https://example.com/fts-title"
+        )
+        Papers.objects.create(
+            doi="10.1234/fts-abstract",
+            title="A survey of learning methods",
+            publishing_year=2021,
+            abstract="This survey covers graph neural networks and transformers.",
+            citations_count=5,
+            link="https://example.com/fts-abstract"
+        )
+
+    def test_search_vector_kept_current(self):
+        paper = Papers.objects.get(doi="10.1234/fts-abstract")
+        paper.title = "Quantum annealing"
+        paper.save()
+        self.assertTrue(Papers.objects.filter(search_vector=SearchQuery("quantum", config="english")).exists())
+
+    def test_title_match_ranks_above_abstract_match(self):
+        response = self.client.get("/search/?q=graph networks")
+        dois = [paper.doi for paper in response.context["papers"]]
+        self.assertEqual(dois, ["10.1234/fts-title", "10.1234/fts-abstract"])
+        self.assertIn("<mark>", response.context["papers"][1].headline)
+
+    def test_headline_escapes_abstract_markup(self):
+        Papers.objects.create(
+            doi="10.1234/fts-markup", title="Markup", publishing_year=2020,
+            abstract="<jats:p>Quantum <script>alert(1)</script> & photonic circuits.</jats:p>",
+            citations_count=0, link="https://example.com/fts-markup"
+        )
+        response = self.client.get("/search/?q=photonic")
+        headline = response.context["papers"][0].headline
+        self.assertIn("<mark>photonic</mark>", headline)
+        self.assertNotIn("<script>", headline)
+        self.assertNotIn("<jats:p>", headline)
+        self.assertIn("&amp;", headline)
+
+
+class FuzzyLookupTest(TestCase):
+    def setUp(self):
+        Authors.objects.create(id="at1", name="Andrew N. Meltzoff", orcid="0000-0001-2345-678X")
+        Authors.objects.create(id="at2", name="Jane Doe", orcid="0000-0002-1825-0097")
+        Keywords.objects.create(id="kd1", keyword="reinforcement learning")
+
+    def test_near_miss_author_name(self):
+        self.assertEqual([a.id for a in search_utils.Match_Authors("Meltzof")], ["at1"])
+
+    def test_exact_orcid(self):
+        self.assertEqual([a.id for a in search_utils.Match_Authors("0000-0001-2345-678x")], ["at1"])
+
+    def test_near_miss_keyword(self):
+        self.assertEqual([k.id for k in search_utils.Match_Keywords("reinforcment")], ["kd1"])
+
+
+class KeysetPaginationTest(TestCase):
+    def setUp(self):
+        search_utils.SEARCH_CACHE.clear()
+        for i in range(search_utils.PAGE_SIZE * 2 + 5):
+            Papers.objects.create(
+                doi=f"10.1234/page-{i:03d}",
+                title=f"Paginated learning paper {i}",
+                publishing_year=2000 + i % 3,
+                abstract="Learning to paginate.",
+                citations_count=i % 4,
+                link=f"https://example.com/page-{i}"
+            )
+
+    def test_pages_cover_results_once_in_order(self):
+        seen, cursor = [], None
+        while True:
+            params = {"q": "paginated"}
+            if cursor:
+                params["cursor"] = cursor
+            response = self.client.get("/search/", params)
+            seen.extend(paper.doi for paper in response.context["papers"])
+            self.assertLessEqual(len(response.context["papers"]), search_utils.PAGE_SIZE)
+            cursor = response.context["next_cursor"]
+            if not cursor:
+                break
+
+        expected = list(
+            Papers.objects.order_by("-citations_count", "-publishing_year", "doi").values_list("doi", flat=True)
+        )
+        self.assertEqual(seen, expected)
+
+    def test_invalid_cursor_is_rejected(self):
+        crafted = [
+            "not-a-cursor",
+            base64.urlsafe_b64encode(b'[1, 1e999, 2020, "x", 1]').decode(),  # int(inf) overflows
+            base64.urlsafe_b64encode(b'[NaN, 1, 2020, "x", 1]').decode(),
+            base64.urlsafe_b64encode(b'{"a": 1}').decode(),
+        ]
+        for cursor in crafted:
+            response = self.client.get("/search/", {"q": "paginated", "cursor": cursor})
+            self.assertEqual(response.status_code, 400, cursor)
+
+
+class SingleQuerySearchTest(TestCase):
+    def setUp(self):
+        author = Authors.objects.create(id="sq1", name="Grace Hopper")
+        keyword = Keywords.objects.create(id="sqk", keyword="compilers")
+        for i, title in enumerate(["Compilers in practice", "Unrelated topic", "Another unrelated topic"]):
+            Papers.objects.create(
+                doi=f"10.1234/sq-{i}", title=title, publishing_year=2020,
+                abstract="Text.", citations_count=i, link=f"https://example.com/sq-{i}"
+            )
+        Author_Papers.objects.create(doi_id="10.1234/sq-1", author_id=author)
+        Keywords_Paper.objects.create(doi_id="10.1234/sq-2", keyword_id=keyword)
+
+    def test_branches_combined_in_one_query(self):
+        with CaptureQueriesContext(connection) as queries:
+            papers, next_cursor, total = search_utils.Keyset_Page(search_utils.Matching_Papers("hopper"), None)
+        self.assertEqual(len(queries), 1)
+        self.assertEqual([paper.doi for paper in papers], ["10.1234/sq-1"])
+        self.assertEqual((next_cursor, total), (None, 1))
+
+    def test_text_and_keyword_matches(self):
+        papers, _, total = search_utils.Keyset_Page(search_utils.Matching_Papers("compilers"), None)
+        self.assertEqual({paper.doi for paper in papers}, {"10.1234/sq-0", "10.1234/sq-2"})
+        self.assertEqual(total, 2)
+
+
+class SemanticSearchTest(TestCase):
+    AXES = {"graph": [1, 0, 0], "vision": [0, 1, 0], "speech": [0, 0, 1]}
+
+    @classmethod
+    def fake_embed(cls, texts):
+        # One axis per topic word, so similarity is easy to predict
+        texts = list(texts)
+        vectors = np.full((len(texts), 3), 0.1, dtype=np.float32)
+        for row, text in enumerate(texts):
+            for word, axis in cls.AXES.items():
+                if word in text.lower():
+                    vectors[row] += axis
+        return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+    def setUp(self):
+        embedding_utils.clear_vector_index()
+        search_utils.SEARCH_CACHE.clear()
+        patcher = mock.patch.object(embedding_utils, "embed_texts", side_effect=self.fake_embed)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        papers = [
+            Papers.objects.create(doi=f"10.1234/sem-{topic}", title=f"{topic.title()} models", publishing_year=2023,
+                                  abstract="", citations_count=0, link=f"https://example.com/{topic}")
+            for topic in self.AXES
+        ]
+        embedding_utils.store_embeddings(papers)
+
+    def test_nearest_paper_first(self):
+        response = self.client.get("/search/", {"q": "speech recognition", "mode": "semantic"})
+        self.assertEqual(response.context["papers"][0].doi, "10.1234/sem-speech")
+
+    def test_json_endpoint(self):
+        response = self.client.get("/api/search/semantic", {"q": "graph", "k": 2})
+        results = response.json()["results"]
+        self.assertEqual(len(results), 2)
+        self.assertEqual(results[0]["doi"], "10.1234/sem-graph")
+        self.assertGreater(results[0]["similarity"], results[1]["similarity"])
+
+    def test_empty_table(self):
+        Paper_Embedding.objects.all().delete()
+        embedding_utils.clear_vector_index()
+        index = embedding_utils.VectorIndex.from_db()
+        self.assertEqual(index.vectors.shape, (0, embedding_utils.EMBEDDING_DIM))
+        self.assertEqual(index.search(np.ones(embedding_utils.EMBEDDING_DIM, dtype=np.float32)), [])
+        response = self.client.get("/api/search/semantic", {"q": "graph"})
+        self.assertEqual((response.status_code, response.json()["results"]), (200, []))
+
+    def test_new_epoch_rebuilds_off_the_request_path(self):
+        epoch = rollup_utils.current_epoch(embedding_utils.EMBEDDING_EPOCH)
+        index = embedding_utils.get_vector_index(epoch)
+        with mock.patch.object(embedding_utils, "_schedule_rebuild") as schedule, \
+                mock.patch.object(embedding_utils.VectorIndex, "from_db") as from_db:
+            self.assertIs(embedding_utils.get_vector_index(epoch + 1), index)  # previous index served meanwhile
+        schedule.assert_called_once_with(epoch + 1)
+        from_db.assert_not_called()
+        self.assertFalse(embedding_utils.index_is_current(epoch + 1))
+
+    def test_partitioned_index_matches_brute_force(self):
+        rng = np.random.default_rng(1)
+        vectors = rng.normal(size=(400, 16)).astype(np.float32)
+        vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+        dois = [f"d{i}" for i in range(400)]
+        query = vectors[7]
+
+        brute = embedding_utils.VectorIndex(dois, vectors, partitioned=False).search(query, 1)
+        partitioned = embedding_utils.VectorIndex(dois, vectors, partitioned=True).search(query, 1)
+        self.assertEqual(brute[0][0], "d7")
+        self.assertEqual(partitioned[0][0], "d7")
+
+
+class SearchCacheTest(TestCase):
+    def setUp(self):
+        search_utils.SEARCH_CACHE.clear()
+        Papers.objects.create(
+            doi="10.1234/cache-1", title="Machine learning systems", publishing_year=2024,
+            abstract="Learning.", citations_count=1, link="https://example.com/cache-1"
+        )
+
+    def test_normalised_queries_share_an_entry(self):
+        self.assertEqual(search_utils.Normalise_Query("  Machine   LEARNING "), "machin learn")
+
+        self.client.get("/search/", {"q": "Machine Learning"})
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get("/search/", {"q": "machine  learning"})
+        self.assertEqual(len(queries), 1)  # only the epoch lookup
+        self.assertEqual([p.doi for p in response.context["papers"]], ["10.1234/cache-1"])
+        self.assertEqual(self.client.get("/api/search/cache").json()["hits"], 3)  # page + authors + facet counts
+
+    def test_inflections_share_an_entry(self):
+        Papers.objects.create(
+            doi="10.1234/cache-3", title="Neural networks", publishing_year=2024,
+            abstract="A network.", citations_count=0, link="https://example.com/cache-3"
+        )
+        self.assertEqual(search_utils.Normalise_Query("networks"), search_utils.Normalise_Query("network"))
+
+        self.client.get("/search/", {"q": "network"})
+        response = self.client.get("/search/", {"q": "networks"})
+        self.assertEqual([p.doi for p in response.context["papers"]], ["10.1234/cache-3"])
+        stats = search_utils.SEARCH_CACHE.stats()
+        self.assertEqual(stats["hits"], 2)  # page + facet counts
+        self.assertEqual(stats["misses"], 4)  # author names are looked up on the raw text of each
+
+    def test_ingest_invalidates(self):
+        self.client.get("/search/", {"q": "machine learning"})
+        Papers.objects.create(
+            doi="10.1234/cache-2", title="Machine learning at scale", publishing_year=2024,
+            abstract="Learning.", citations_count=0, link="https://example.com/cache-2"
+        )
+        rollup_utils.record_papers([2024])
+
+        response = self.client.get("/search/", {"q": "machine learning"})
+        self.assertEqual(len(response.context["papers"]), 2)
+        self.assertEqual(search_utils.SEARCH_CACHE.stats()["misses"], 6)  # page + authors + facet counts, twice
+
+    def test_lru_eviction(self):
+        cache = search_utils.SearchResultCache(max_entries=2)
+        cache.set("a", 0, 1)
+        cache.set("b", 0, 2)
+        cache.get("a", 0)
+        cache.set("c", 0, 3)
+        self.assertIsNone(cache.get("b", 0))
+        self.assertEqual(cache.get("a", 0), 1)
+        self.assertEqual(cache.stats()["evictions"], 1)
+
+
+class SuggestTest(TestCase):
+    def setUp(self):
+        suggest_utils.clear_suggest_index()
+        self.addCleanup(suggest_utils.clear_suggest_index)
+        for doi, title, citations in [("10.1234/s-1", "Neural networks for vision", 3),
+                                      ("10.1234/s-2", "Neural machine translation", 40),
+                                      ("10.1234/s-3", "Network security", 10)]:
+            Papers.objects.create(doi=doi, title=title, publishing_year=2020, abstract="",
+                                  citations_count=citations, link="https://example.com")
+        author = Authors.objects.create(id="sg1", name="Yann LeCun")
+        Author_Papers.objects.create(doi_id="10.1234/s-1", author_id=author)
+        Keywords.objects.create(id="sgk", keyword="neural networks")
+
+    def test_prefix_ranked_by_citations(self):
+        titles = [item["doi"] for item in suggest_utils.get_suggest_index().suggest("neur")["titles"]]
+        self.assertEqual(titles, ["10.1234/s-2", "10.1234/s-1"])
+
+        titles = [item["doi"] for item in suggest_utils.get_suggest_index().suggest("netw")["titles"]]
+        self.assertEqual(titles, ["10.1234/s-3", "10.1234/s-1"])
+
+        titles = [item["doi"] for item in suggest_utils.get_suggest_index().suggest("neural netw")["titles"]]
+        self.assertEqual(titles, ["10.1234/s-1"])
+
+    def test_endpoint_served_from_memory(self):
+        suggest_utils.get_suggest_index()
+        with CaptureQueriesContext(connection) as queries:
+            data = self.client.get("/api/suggest", {"q": "lec"}).json()
+        self.assertEqual(len(queries), 0)
+        self.assertEqual(data["authors"], [{"name": "Yann LeCun", "id": "sg1"}])
+        self.assertEqual(data["keywords"], [])
+
+    def test_empty_until_the_background_build_is_ready(self):
+        with mock.patch.object(suggest_utils, "warm_suggest_index") as warm, \
+                CaptureQueriesContext(connection) as queries:
+            data = self.client.get("/api/suggest", {"q": "neur"}).json()
+        self.assertEqual(data["titles"], [])
+        self.assertEqual(len(queries), 0)  # the request does not build the index itself
+        warm.assert_called_once()
+
+    def test_new_rows_added_incrementally(self):
+        suggest_utils.get_suggest_index()
+        Keywords.objects.create(id="sgk2", keyword="lexical analysis")
+        self.assertEqual(suggest_utils.get_suggest_index().suggest("lexi")["keywords"], [{"keyword": "lexical analysis", "id": "sgk2"}])
+
+    def test_refresh_appends_rows_from_other_processes(self):
+        index = suggest_utils.get_suggest_index()
+        with mock.patch.object(suggest_utils, "_index", None):  # saved elsewhere: no signal reaches this index
+            Papers.objects.create(doi="10.1234/s-4", title="Lexical scoping", publishing_year=2021, abstract="",
+                                  citations_count=99, link="https://example.com")
+        with CaptureQueriesContext(connection) as queries:
+            index.add_new_rows()
+        self.assertTrue(all('"created" >=' in query["sql"] for query in queries[1:]))  # past the epoch lookup
+        index.add_new_rows()
+        self.assertEqual(index.suggest("lexi")["titles"], [{"title": "Lexical scoping", "doi": "10.1234/s-4"}])
+        # appended below the weighted entries until the next full rebuild
+        self.assertEqual(index.titles.refs[-1], "10.1234/s-4")
+
+
+class FacetTest(TestCase):
+    def setUp(self):
+        search_utils.SEARCH_CACHE.clear()
+        keyword = Keywords.objects.create(id="fk1", keyword="optimisation")
+        other = Keywords.objects.create(id="fk2", keyword="robotics")
+        for i, (year, paper_type) in enumerate([(2018, "journal-article"), (2021, "journal-article"),
+                                                (2022, "proceedings-article"), (2024, "journal-article")]):
+            paper = Papers.objects.create(
+                doi=f"10.1234/facet-{i}", title=f"Convex solvers {i}", publishing_year=year,
+                abstract="Solvers.", citations_count=i, link="https://example.com", paper_type=paper_type
+            )
+            Keywords_Paper.objects.create(doi=paper, keyword_id=keyword)
+            if i % 2:
+                Keywords_Paper.objects.create(doi=paper, keyword_id=other)
+
+    def test_counts_in_one_query(self):
+        with CaptureQueriesContext(connection) as queries:
+            facets = search_utils.Facet_Counts(search_utils.Matching_Papers("solvers"))
+        self.assertEqual(len(queries), 1)
+        self.assertEqual([(b["value"], b["count"]) for b in facets["years"]], [(2020, 3), (2015, 1)])
+        self.assertEqual([(t["value"], t["count"]) for t in facets["types"]], [("journal-article", 3), ("proceedings-article", 1)])
+        self.assertEqual([(k["label"], k["count"]) for k in facets["keywords"]], [("optimisation", 4), ("robotics", 2)])
+
+    def test_selecting_facet_narrows_results_and_keeps_counts(self):
+        self.client.get("/search/", {"q": "solvers"})
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get("/search/", {"q": "solvers", "year": 2020, "keyword": "fk2"})
+        self.assertEqual([p.doi for p in response.context["papers"]], ["10.1234/facet-3", "10.1234/facet-1"])
+        self.assertEqual(response.context["facets"]["years"][0]["count"], 3)
+        self.assertFalse(any("WITH matched" in q["sql"] for q in queries))
+
+
+class SummaryStoreTest(TestCase):
+    def setUp(self):
+        self.paper = Papers.objects.create(
+            doi="10.1234/sum-1", title="Summaries", publishing_year=2024,
+            abstract="A long abstract.", citations_count=0, link="https://example.com"
+        )
+        self.store = summary_utils.SummaryStore()
+
+    def test_generated_once_then_served_from_table(self):
+        with mock.patch.object(summarize_utils, "summarize_with_source", return_value=("Short.", "model")) as generate:
+            self.assertEqual(self.store.get(self.paper, 30, 60), "Short.")
+            self.assertEqual(self.store.get(self.paper, 30, 60), "Short.")
+            self.store.clear()
+            self.assertEqual(self.store.get(self.paper, 30, 60), "Short.")
+        generate.assert_called_once()
+        self.assertEqual(Paper_Summary.objects.count(), 1)
+
+    def test_fallback_not_kept(self):
+        with mock.patch.object(summarize_utils, "summarize_with_source", return_value=("Tf-idf.", "fallback")) as generate:
+            self.store.get(self.paper)
+            self.store.get(self.paper)  # retried, not served from memory
+        self.assertEqual(generate.call_count, 2)
+        self.assertFalse(Paper_Summary.objects.exists())
+
+    def test_finished_background_result_is_dropped_once_read(self):
+        with mock.patch.object(summarize_utils, "summarize_with_source", return_value=("Tf-idf.", "fallback")):
+            self.assertEqual(self.store.request(self.paper), ("pending", None))
+            key = self.store.key(self.paper.doi, 30, 60)
+            self.assertEqual(self.store.wait(key, 5), "Tf-idf.")
+        self.assertEqual(self.store._queued, {})
+
+    def test_concurrent_requests_share_one_generation(self):
+        started, release = threading.Event(), threading.Event()
+
+        def slow_generate(*args):
+            started.set()
+            release.wait(5)
+            return "Shared.", "fallback"
+
+        results, waiting = [], threading.Event()
+
+        class WatchedEvent(threading.Event):
+            def wait(self, timeout=None):
+                waiting.set()
+                return super().wait(timeout)
+
+        def request():
+            results.append(self.store.get(self.paper))
+            connection.close()
+
+        with mock.patch.object(summarize_utils, "summarize_with_source", side_effect=slow_generate) as generate, \
+                mock.patch.object(summary_utils, "_Flight", lambda: mock.Mock(done=WatchedEvent(), error=None)):
+            leader = threading.Thread(target=request)
+            leader.start()
+            started.wait(5)
+            follower = threading.Thread(target=request)
+            follower.start()
+            waiting.wait(5)  # the follower has joined the flight
+            release.set()
+            leader.join(5)
+            follower.join(5)
+        self.assertEqual(results, ["Shared.", "Shared."])
+        generate.assert_called_once()
+
+
+class BackgroundSummaryTest(TestCase):
+    def setUp(self):
+        summary_utils.SUMMARY_STORE.clear()
+        Papers.objects.create(
+            doi="10.1234/bg-1", title="Background", publishing_year=2024,
+            abstract="A long abstract.", citations_count=0, link="https://example.com"
+        )
+
+    def slow_summary(self, *args):
+        time.sleep(0.2)
+        return "Later.", "fallback"
+
+    @override_settings(SUMMARY_LATENCY_BUDGET=0, SUMMARY_STREAMING=False)
+    def test_page_does_not_wait_and_api_reports_ready(self):
+        with mock.patch.object(summarize_utils, "summarize_with_source", side_effect=self.slow_summary) as generate:
+            response = self.client.get("/paper/", {"doi": "10.1234/bg-1"})
+            self.assertEqual(response.context["summary_status"], "pending")
+            self.assertEqual(response.context["summary"], "A long abstract.")  # extractive stand-in
+
+            key = summary_utils.SUMMARY_STORE.key("10.1234/bg-1", 30, 60)
+            summary_utils.SUMMARY_STORE._queued[key].result(timeout=5)
+
+            data = self.client.get("/api/summary", {"doi": "10.1234/bg-1"}).json()
+        self.assertEqual(data, {"status": "ready", "summary": "Later."})
+        generate.assert_called_once()
+
+    def test_unknown_paper(self):
+        self.assertEqual(self.client.get("/api/summary", {"doi": "10.1234/missing"}).status_code, 404)
+
+    @override_settings(SUMMARY_LATENCY_BUDGET=0)
+    def test_streaming_is_opt_in(self):
+        with mock.patch.object(summarize_utils, "summarize_with_source", side_effect=self.slow_summary):
+            response = self.client.get("/paper/", {"doi": "10.1234/bg-1"})
+            key = summary_utils.SUMMARY_STORE.key("10.1234/bg-1", 30, 60)
+            summary_utils.SUMMARY_STORE.wait(key, 5)
+        self.assertEqual(response.context["summary_status"], "pending")  # the latency-budget path, then polling
+        self.assertNotContains(response, "/api/summary/stream")
+
+
+class DeadlineSummaryTest(TransactionTestCase):
+    # Committed rows, so the background generation thread can store the model summary
+    ABSTRACT = "First sentence about graphs. Second sentence about trees. Third sentence about graphs and trees."
+
+    def setUp(self):
+        summary_utils.SUMMARY_STORE.clear()
+        summary_utils.SUMMARY_PATHS.clear()
+        self.paper = Papers.objects.create(
+            doi="10.1234/deadline-1", title="Deadline", publishing_year=2024,
+            abstract=self.ABSTRACT, citations_count=0, link="https://example.com"
+        )
+
+    def tearDown(self):
+        summarize_utils.DECODE_COST.seconds_per_token = None
+
+    def summarize(self, delay):
+        def generate(*args):
+            time.sleep(delay)
+            return "Model summary.", "model"
+        return mock.patch.object(inference_utils, "summarize", side_effect=generate)
+
+    def test_decode_cost_moving_average(self):
+        cost = summarize_utils.DecodeCost(alpha=0.5)
+        self.assertIsNone(cost.estimate(100))
+        cost.observe(1.0, 100)
+        cost.observe(3.0, 100)
+        self.assertAlmostEqual(cost.estimate(100), 2.0)
+
+    def test_fast_model_is_served_then_cached(self):
+        with self.summarize(0):
+            self.assertEqual(summary_utils.Summarize_Within(self.paper, budget=5), ("Model summary.", "ready"))
+            self.assertEqual(summary_utils.Summarize_Within(self.paper, budget=5), ("Model summary.", "ready"))
+        self.assertEqual(summary_utils.SUMMARY_PATHS.snapshot(), {"model": 1, "cached": 1})
+
+    def test_slow_model_serves_extractive_and_finishes_later(self):
+        with self.summarize(0.3):
+            start = time.perf_counter()
+            summary, status = summary_utils.Summarize_Within(self.paper, budget=0.05)
+            self.assertLess(time.perf_counter() - start, 0.25)
+            self.assertEqual(status, "pending")
+            self.assertEqual(summary, summarize_utils.extractive_summary(self.ABSTRACT))
+
+            key = summary_utils.SUMMARY_STORE.key(self.paper.doi, 30, 60)
+            summary_utils.SUMMARY_STORE._queued[key].result(timeout=5)
+        self.assertEqual(summary_utils.SUMMARY_STORE.cached(key), "Model summary.")
+        self.assertEqual(summary_utils.SUMMARY_PATHS.snapshot(), {"timeout": 1})
+
+    def test_estimate_over_budget_skips_the_wait(self):
+        summarize_utils.DECODE_COST.seconds_per_token = 1.0
+        with self.summarize(0.3):
+            start = time.perf_counter()
+            _, status = summary_utils.Summarize_Within(self.paper, budget=1)
+            self.assertLess(time.perf_counter() - start, 0.2)
+            self.assertEqual(status, "pending")
+
+            key = summary_utils.SUMMARY_STORE.key(self.paper.doi, 30, 60)
+            summary_utils.SUMMARY_STORE._queued[key].result(timeout=5)
+        self.assertEqual(summary_utils.SUMMARY_PATHS.snapshot(), {"deadline": 1})
+        self.assertEqual(self.client.get("/api/summary/stats").json()["paths"], {"deadline": 1})
+
+    def test_summarize_text_budget(self):
+        summarize_utils.DECODE_COST.seconds_per_token = 1.0
+        text = " ".join(["Graphs are trees with cycles."] * 5)
+        with mock.patch.object(summarize_utils, "_get_summarizer") as load:
+            summary, source = summarize_utils.summarize_with_source(text, budget=1)
+        self.assertEqual(source, "deadline")
+        load.assert_not_called()
+
+
+def tiny_bart():
+    """A randomly initialised two-layer BART and a tokenizer stub feeding it 40 token ids."""
+    from transformers import BartConfig, BartForConditionalGeneration
+    torch.manual_seed(0)
+    model = BartForConditionalGeneration(BartConfig(
+        vocab_size=64, d_model=16, encoder_layers=1, decoder_layers=1, encoder_attention_heads=2,
+        decoder_attention_heads=2, encoder_ffn_dim=32, decoder_ffn_dim=32, max_position_embeddings=64,
+    )).eval()
+    ids = torch.randint(4, 64, (1, 40))
+    tokenizer = mock.MagicMock(return_value={"input_ids": ids, "attention_mask": torch.ones_like(ids)})
+    tokenizer.decode.side_effect = lambda ids, **kwargs: " ".join(map(str, torch.as_tensor(ids).tolist()))
+    return model, tokenizer
+
+
+@override_settings(SUMMARY_STREAMING=True)
+class SummaryStreamTest(TestCase):
+    ABSTRACT = " ".join(["Streaming summaries arrive one piece at a time."] * 4)
+
+    def setUp(self):
+        summary_utils.SUMMARY_STORE.clear()
+        Papers.objects.create(
+            doi="10.1234/stream-1", title="Stream", publishing_year=2024,
+            abstract=self.ABSTRACT, citations_count=0, link="https://example.com"
+        )
+
+    def fake_model(self, pieces):
+        model = mock.MagicMock()
+
+        def generate(streamer, **kwargs):
+            for piece in pieces:
+                streamer.on_finalized_text(piece)
+            streamer.on_finalized_text("", stream_end=True)
+        model.generate.side_effect = generate
+        return model
+
+    def blocking_model(self, release):
+        """Writes one piece, then decodes until released or stopped by its stopping criteria."""
+        model = mock.MagicMock()
+
+        def generate(streamer, stopping_criteria, **kwargs):
+            streamer.on_finalized_text("First ")
+            ids = torch.ones((1, 1), dtype=torch.long)
+            while not release.is_set() and not stopping_criteria(ids, None).all():
+                time.sleep(0.01)
+            streamer.on_finalized_text("piece.", stream_end=True)
+        model.generate.side_effect = generate
+        return model
+
+    def model_patches(self, model):
+        tokenizer = mock.MagicMock(return_value={"input_ids": torch.ones((1, 40), dtype=torch.long)})
+        return (mock.patch.object(summarize_utils, "_get_summarizer", return_value=model),
+                mock.patch.object(summarize_utils, "tokenizer", tokenizer),
+                mock.patch.object(Paper_Summary.objects, "bulk_create"))
+
+    def stream(self):
+        response = self.client.get("/api/summary/stream", {"doi": "10.1234/stream-1"})
+        self.assertEqual(response["Content-Type"], "text/event-stream")
+        return b"".join(response.streaming_content).decode()
+
+    def test_pieces_then_done(self):
+        tokenizer = mock.MagicMock(return_value={"input_ids": torch.ones((1, 40), dtype=torch.long)})
+        with mock.patch.object(summarize_utils, "_get_summarizer", return_value=self.fake_model(["Pieces ", "arrive."])), \
+                mock.patch.object(summarize_utils, "tokenizer", tokenizer), \
+                mock.patch.object(Paper_Summary.objects, "bulk_create") as store:
+            body = self.stream()
+
+        self.assertEqual(body.split("\n\n")[:3], [
+            'event: token\ndata: {"text": "Pieces "}',
+            'event: token\ndata: {"text": "arrive."}',
+            'event: done\ndata: {"summary": "Pieces arrive.", "source": "model"}',
+        ])
+        store.assert_called_once()
+        self.assertIn("cache", self.stream())  # the finished summary is served from the store next time
+
+    def test_failed_generation_ends_with_tfidf(self):
+        model = mock.MagicMock()
+        model.generate.side_effect = RuntimeError("out of memory")
+        tokenizer = mock.MagicMock(return_value={"input_ids": torch.ones((1, 40), dtype=torch.long)})
+        with mock.patch.object(summarize_utils, "_get_summarizer", return_value=model), \
+                mock.patch.object(summarize_utils, "tokenizer", tokenizer):
+            stream = summarize_utils.SummaryStream(self.ABSTRACT)
+            self.assertEqual(list(stream), [])
+        self.assertEqual(stream.source, "fallback")
+        self.assertTrue(stream.summary)
+
+    def test_streams_with_a_beam_search_generation_config(self):
+        model, tokenizer = tiny_bart()
+        model.generation_config.num_beams = 4  # like DistilBART's
+        with mock.patch.object(summarize_utils, "_get_summarizer", return_value=model), \
+                mock.patch.object(summarize_utils, "tokenizer", tokenizer):
+            stream = summarize_utils.SummaryStream(self.ABSTRACT)
+            pieces = list(stream)
+        self.assertEqual(stream.source, "model")
+        self.assertTrue(pieces)
+
+    def test_viewers_share_one_generation(self):
+        paper, release = Papers.objects.get(doi="10.1234/stream-1"), threading.Event()
+        model = self.blocking_model(release)
+        load, tokenize, store = self.model_patches(model)
+        with load, tokenize, store:
+            first = summary_utils.SUMMARY_STORE.stream(paper)
+            second = summary_utils.SUMMARY_STORE.stream(paper)
+            release.set()
+            self.assertEqual("".join(first.follow(5)), "First piece.")
+            self.assertEqual("".join(second.follow(5)), "First piece.")
+            summary_utils.SUMMARY_STORE.leave(first)
+            summary_utils.SUMMARY_STORE.leave(second)
+        self.assertIs(first, second)
+        model.generate.assert_called_once()
+        self.assertEqual(first.source, "model")
+
+    def test_disconnect_stops_the_model(self):
+        model = self.blocking_model(threading.Event())
+        load, tokenize, store = self.model_patches(model)
+        with load, tokenize, store:
+            response = self.client.get("/api/summary/stream", {"doi": "10.1234/stream-1"})
+            self.assertIn(b"First", next(response.streaming_content))
+            key = summary_utils.SUMMARY_STORE.key("10.1234/stream-1", 30, 60)
+            flight = summary_utils.SUMMARY_STORE._streams[key]
+            # What the server does when the client goes away (request_finished would close the test's connection)
+            with mock.patch.object(request_finished, "send"):
+                response.close()
+            list(flight.follow(5))
+        self.assertTrue(flight.cancel.is_set())
+        self.assertEqual(flight.source, "fallback")
+
+    @override_settings(SUMMARY_STREAM_SECONDS=0.1)
+    def test_long_generation_hands_over_to_polling(self):
+        release = threading.Event()
+        load, tokenize, store = self.model_patches(self.blocking_model(release))
+        with load, tokenize, store:
+            body = self.stream()
+            self.assertTrue(body.startswith('event: token\ndata: {"text": "First "}'))
+            self.assertIn("event: pending", body)
+
+            key = summary_utils.SUMMARY_STORE.key("10.1234/stream-1", 30, 60)
+            flight = summary_utils.SUMMARY_STORE._streams[key]
+            self.assertEqual(self.client.get("/api/summary", {"doi": "10.1234/stream-1"}).json()["status"], "pending")
+            release.set()
+            list(flight.follow(5))
+        self.assertFalse(flight.cancel.is_set())
+        self.assertEqual(self.client.get("/api/summary", {"doi": "10.1234/stream-1"}).json(),
+                         {"status": "ready", "summary": "First piece."})
+
+    def test_page_streams_cold_summaries(self):
+        response = self.client.get("/paper/", {"doi": "10.1234/stream-1"})
+        self.assertEqual(response.context["summary_status"], "streaming")
+        self.assertContains(response, "/api/summary/stream")
+
+
+class EncoderCacheTest(TestCase):
+    TEXT = " ".join(["Encoder states are shared between summary lengths."] * 4)
+
+    def setUp(self):
+        self.model, self.tokenizer = tiny_bart()
+        summarize_utils.ENCODER_CACHE.clear()
+
+    def summarize(self, min_percent, max_percent):
+        torch.manual_seed(1)
+        return summarize_utils.summarize_with_source(self.TEXT, min_percent, max_percent)
+
+    def test_new_length_runs_only_the_decoder(self):
+        encoder = self.model.get_encoder()
+        with mock.patch.object(summarize_utils, "_get_summarizer", return_value=self.model), \
+                mock.patch.object(summarize_utils, "tokenizer", self.tokenizer), \
+                mock.patch.object(encoder, "forward", wraps=encoder.forward) as encode:
+            first = self.summarize(30, 60)
+            self.summarize(40, 70)
+            again = self.summarize(30, 60)
+
+        self.assertEqual(encode.call_count, 1)
+        self.assertEqual(self.tokenizer.call_count, 1)
+        self.assertEqual(first, again)  # same output as the first, fully encoded run
+        self.assertEqual(first[1], "model")
+
+    def test_beam_search_leaves_cached_states_alone(self):
+        self.model.generation_config.num_beams = 4
+        with mock.patch.object(summarize_utils, "_get_summarizer", return_value=self.model), \
+                mock.patch.object(summarize_utils, "tokenizer", self.tokenizer):
+            first = self.summarize(30, 60)
+            again = self.summarize(30, 60)
+            kwargs, _, hit = summarize_utils.ENCODER_CACHE.get(self.model, self.TEXT)
+
+        self.assertTrue(hit)
+        self.assertEqual(tuple(kwargs["encoder_outputs"].last_hidden_state.shape), (1, 40, 16))
+        self.assertEqual(first, again)
+
+
+class CorpusIdfTest(TestCase):
+    ABSTRACTS = [
+        "Graph neural networks learn on graphs. Graphs model molecules. Neural networks need data. Molecules are graphs of atoms.",
+        "Transformers summarise text. Text summaries help readers. Readers skim. Summaries of text are short.",
+        "Short abstract.",
+    ]
+
+    def setUp(self):
+        for i, abstract in enumerate(self.ABSTRACTS):
+            Papers.objects.create(
+                doi=f"10.1234/idf-{i}", title="IDF", publishing_year=2024,
+                abstract=abstract, citations_count=0, link="https://example.com"
+            )
+        self.path = os.path.join(tempfile.mkdtemp(), "idf.npy")
+        summarize_utils.reset_corpus_idf()
+
+    def tearDown(self):
+        summarize_utils.reset_corpus_idf()
+
+    def test_fit_load_and_batch(self):
+        call_command("fit_idf", output=self.path, stdout=io.StringIO())
+        with override_settings(SUMMARY_IDF_PATH=self.path):
+            idf = summarize_utils._corpus_idf()
+            self.assertIsInstance(idf, np.memmap)
+            self.assertEqual(idf.shape, (summarize_utils.IDF_FEATURES,))
+
+            single = [summarize_utils._tfidf_fallback(text, 30, 60) for text in self.ABSTRACTS]
+            self.assertEqual(summarize_utils.extractive_batch(self.ABSTRACTS, 30, 60), single)
+        self.assertEqual(single[2], "Short abstract.")
+        self.assertTrue(single[0].startswith("Graph neural networks learn on graphs."))  # the most central sentence
+        self.assertEqual(single[0].count("."), 2)
+
+    def test_without_artifact_uses_per_abstract_idf(self):
+        with override_settings(SUMMARY_IDF_PATH=self.path):
+            self.assertIsNone(summarize_utils._corpus_idf())
+            self.assertTrue(summarize_utils._tfidf_fallback(self.ABSTRACTS[0], 30, 60))
+
+
+class LongTextSummaryTest(TestCase):
+    class WordTokenizer:
+        """One token per word, so window sizes are easy to follow."""
+
+        def __call__(self, texts, **kwargs):
+            if isinstance(texts, str):
+                return {"input_ids": texts.split()}
+            return {"input_ids": [text.split() for text in texts]}
+
+        def decode(self, ids, **kwargs):
+            return " ".join(ids)
+
+    def setUp(self):
+        # 40 sentences of 50 words: 2000 tokens, about twice the encoder window
+        self.sentences = [" ".join([f"s{i}"] * 49) + f" end{i}." for i in range(40)]
+        self.text = " ".join(self.sentences)
+        self.batches = []
+
+    def fake_batch(self, texts, min_percent, max_percent, chunk_long=True):
+        self.batches.append(texts)
+        return [(f"partial {text.split()[0]}.", "model") for text in texts]
+
+    def test_windows_overlap_by_one_sentence(self):
+        chunks = summarize_utils._chunk_sentences(["a b.", "c d.", "e f.", "g h."], [2, 2, 2, 2], chunk_tokens=4)
+        self.assertEqual(chunks, ["a b. c d.", "c d. e f.", "e f. g h."])
+
+    def test_map_then_reduce(self):
+        with mock.patch.object(summarize_utils, "tokenizer", self.WordTokenizer()), \
+                mock.patch.object(summarize_utils, "summarize_batch", side_effect=self.fake_batch), \
+                mock.patch.object(summarize_utils, "summarize_with_source", return_value=("Fused.", "model")) as reduce:
+            self.assertEqual(summarize_utils.summarize_long(self.text), ("Fused.", "model"))
+
+        windows = [text for batch in self.batches for text in batch]
+        self.assertEqual(len(windows), 3)  # 18 + 18 + 6 sentences, with one sentence of overlap
+        self.assertTrue(all(len(batch) <= summarize_utils.CHUNK_BATCH for batch in self.batches))
+        self.assertIn("end39.", windows[-1])  # nothing past the encoder window is dropped
+        self.assertEqual(reduce.call_args.args[0], "partial s0. partial s17. partial s34.")
+
+    def test_windows_past_the_cap_use_tfidf(self):
+        with mock.patch.object(summarize_utils, "tokenizer", self.WordTokenizer()), \
+                mock.patch.object(summarize_utils, "summarize_batch", side_effect=self.fake_batch), \
+                mock.patch.object(summarize_utils, "MAX_CHUNKS", 1), \
+                mock.patch.object(summarize_utils, "summarize_with_source", return_value=("Fused.", "model")):
+            summary, source = summarize_utils.summarize_long(self.text)
+        self.assertEqual(len(self.batches), 1)
+        self.assertEqual(source, "fallback")
+
+    def test_text_without_sentence_boundaries_is_split_by_tokens(self):
+        text = "\n".join(" ".join(f"w{line}x{i}" for i in range(10)) for line in range(150))  # 1500 words, no ". "
+        with mock.patch.object(summarize_utils, "tokenizer", self.WordTokenizer()), \
+                mock.patch.object(summarize_utils, "_get_summarizer", return_value=mock.Mock()), \
+                mock.patch.object(summarize_utils, "summarize_batch", side_effect=self.fake_batch):
+            summary, source = summarize_utils.summarize_with_source(text)
+
+        windows = [text for batch in self.batches for text in batch]
+        self.assertEqual([len(window.split()) for window in windows], [900, 600])
+        self.assertIn("w149x9", windows[-1])
+        self.assertEqual(source, "model")
+
+    def test_failure_falls_back_to_tfidf(self):
+        with mock.patch.object(summarize_utils, "tokenizer", self.WordTokenizer()), \
+                mock.patch.object(summarize_utils, "_get_summarizer", return_value=mock.Mock()), \
+                mock.patch.object(summarize_utils, "summarize_long", side_effect=RecursionError):
+            summary, source = summarize_utils.summarize_with_source(self.text)
+        self.assertEqual(source, "fallback")
+        self.assertTrue(summary)
+
+
+class ModelRegistryTest(TestCase):
+    def test_loads_once_under_concurrency(self):
+        loads = []
+
+        def load():
+            loads.append(1)
+            time.sleep(0.05)
+            return object()
+
+        registry = model_utils.ModelRegistry({"slow": load})
+        models = []
+        threads = [threading.Thread(target=lambda: models.append(registry.get("slow"))) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(loads), 1)
+        self.assertEqual(len(set(map(id, models))), 1)
+        stats = registry.stats()["slow"]
+        self.assertTrue(stats["loaded"])
+        self.assertGreaterEqual(stats["seconds"], 0.05)
+        with self.assertRaises(KeyError):
+            registry.get("missing")
+
+    def test_background_warm_up_does_not_block(self):
+        loaded = threading.Event()
+
+        def load():
+            loaded.wait(5)
+            return object()
+
+        registry = model_utils.ModelRegistry({"slow": load})
+        with mock.patch.object(model_utils, "REGISTRY", registry):
+            thread = model_utils.warm_models_in_background("slow")
+            self.assertFalse(registry.loaded("slow"))  # returned while the model is still loading
+            loaded.set()
+            thread.join(5)
+        self.assertTrue(registry.loaded("slow"))
+
+    def test_keyword_extractors_share_one_model(self):
+        from .Keyword_extraction import KeywordExtractor
+        model_utils.REGISTRY.clear("keybert")
+        with mock.patch("keybert.KeyBERT") as keybert:
+            extractors = [KeywordExtractor() for _ in range(3)]
+            keybert.assert_not_called()  # constructing an extractor loads nothing
+            model_utils.warm_models("keybert")
+            self.assertTrue(all(extractor.model is keybert.return_value for extractor in extractors))
+        keybert.assert_called_once()
+        model_utils.REGISTRY.clear("keybert")
+        self.assertIn("keybert", self.client.get("/api/models").json()["models"])
+
+
+class KeywordBatchTest(TestCase):
+    def fake_extract(self, docs, keyphrase_ngram_range, **options):
+        self.calls.append((keyphrase_ngram_range, list(docs)))
+        keywords = [[(f"{doc.split()[0]} {keyphrase_ngram_range[1]}", 0.5)] for doc in docs]
+        return keywords[0] if len(docs) == 1 else keywords  # KeyBERT flattens single documents
+
+    def extractor(self):
+        from .Keyword_extraction import KeywordExtractor
+        extractor = KeywordExtractor()
+        model = mock.MagicMock()
+        model.extract_keywords.side_effect = self.fake_extract
+        self.calls = []
+        return extractor, mock.patch.object(model_utils.REGISTRY, "get", return_value=model)
+
+    def test_two_extract_calls_per_batch(self):
+        extractor, model = self.extractor()
+        with model:
+            topics = extractor.ExtractTopicsBatch(["alpha text", "", "beta text", None, "gamma text"], batch_size=2)
+        self.assertEqual(topics, [["alpha 2"], [], ["beta 2"], [], ["gamma 2"]])
+        self.assertEqual([ngrams for ngrams, _ in self.calls], [(1, 5), (1, 2), (1, 5), (1, 2)])
+        self.assertEqual(self.calls[0][1], ["alpha text", "beta text"])
+
+    def test_single_text_matches_batch(self):
+        extractor, model = self.extractor()
+        with model:
+            self.assertEqual(extractor.ExtractTopics("alpha text"), ["alpha 2"])
+            with self.assertRaises(ValueError):
+                extractor.ExtractTopics(None)
+
+    def test_backfill_command_links_keywords(self):
+        for i, abstract in enumerate(["alpha text", "beta text", ""]):
+            Papers.objects.create(
+                doi=f"10.1234/kw-{i}", title="Keywords", publishing_year=2024,
+                abstract=abstract, citations_count=0, link="https://example.com"
+            )
+        _, model = self.extractor()
+        with model:
+            call_command("extract_keywords", batch_size=8, stdout=io.StringIO())
+        self.assertEqual(len(self.calls), 2)
+        self.assertEqual(
+            sorted(Keywords_Paper.objects.values_list("doi_id", "keyword_id__keyword")),
+            [("10.1234/kw-0", "alpha 2"), ("10.1234/kw-1", "beta 2")],
+        )
+
+
+class SummarizeCorpusTest(TestCase):
+    def setUp(self):
+        for i, abstract in enumerate(["short", "a much longer abstract text", "", "medium abstract"]):
+            Papers.objects.create(
+                doi=f"10.1234/corpus-{i}", title="Corpus", publishing_year=2024,
+                abstract=abstract, citations_count=0, link="https://example.com"
+            )
+
+    def fake_batch(self, texts, min_percent, max_percent):
+        self.batches.append(texts)
+        return [(f"summary of {text}", "model") for text in texts]
+
+    def test_batches_and_checkpoints(self):
+        self.batches = []
+        checkpoint = os.path.join(tempfile.mkdtemp(), "checkpoint")
+        with mock.patch.object(summarize_utils, "summarize_batch", side_effect=self.fake_batch):
+            call_command("summarize_corpus", workers=1, batch_size=2, checkpoint=checkpoint, stdout=io.StringIO())
+
+        self.assertEqual(self.batches, [["short", "medium abstract"], ["a much longer abstract text"]])
+        self.assertEqual(Paper_Summary.objects.count(), 3)
+        with open(checkpoint) as f:
+            self.assertEqual(f.read(), "10.1234/corpus-3")
+
+    def test_resumes_after_the_checkpoint(self):
+        self.batches = []
+        checkpoint = os.path.join(tempfile.mkdtemp(), "checkpoint")
+
+        def fail_on_second_batch(texts, min_percent, max_percent):
+            if self.batches:
+                raise RuntimeError("model crashed")
+            return self.fake_batch(texts, min_percent, max_percent)
+
+        with mock.patch.object(summarize_utils, "summarize_batch", side_effect=fail_on_second_batch):
+            with self.assertRaises(RuntimeError):
+                call_command("summarize_corpus", workers=1, chunk_size=1, checkpoint=checkpoint, stdout=io.StringIO())
+        with open(checkpoint) as f:
+            self.assertEqual(f.read(), "10.1234/corpus-0")
+
+        # Without the stored summary, only the checkpoint can keep corpus-0 out of the resumed run
+        Paper_Summary.objects.all().delete()
+        self.batches = []
+        with mock.patch.object(summarize_utils, "summarize_batch", side_effect=self.fake_batch):
+            call_command("summarize_corpus", workers=1, chunk_size=1, checkpoint=checkpoint, stdout=io.StringIO())
+        self.assertEqual(self.batches, [["a much longer abstract text"], ["medium abstract"]])
+        with open(checkpoint) as f:
+            self.assertEqual(f.read(), "10.1234/corpus-3")
+
+
+class InferenceServerTest(TestCase):
+    LONG_TEXT = " ".join(["word"] * 30)
+
+    def fake_batch(self, texts, min_percent, max_percent):
+        self.batches.append(list(texts))
+        return [(f"summary {len(text)}", "model") for text in texts]
+
+    def test_concurrent_requests_share_a_batch(self):
+        self.batches = []
+
+        async def scenario():
+            batcher = inference_utils.MicroBatcher(self.fake_batch, window=0.05)
+            runner = asyncio.create_task(batcher.run())
+            results = await asyncio.gather(*(batcher.submit("x" * n) for n in (3, 1, 2)))
+            runner.cancel()
+            return results
+
+        results = asyncio.run(scenario())
+        self.assertEqual(self.batches, [["x", "xx", "xxx"]])
+        self.assertEqual(results, [("summary 3", "model"), ("summary 1", "model"), ("summary 2", "model")])
+
+    def test_client_round_trip_over_socket(self):
+        self.batches = []
+        path = os.path.join(tempfile.mkdtemp(), "summarizer.sock")
+        loop = asyncio.new_event_loop()
+        server = loop.create_task(inference_utils.serve(path, inference_utils.MicroBatcher(self.fake_batch)))
+        thread = threading.Thread(target=loop.run_forever, daemon=True)
+        thread.start()
+
+        def stop():
+            loop.call_soon_threadsafe(server.cancel)
+            loop.call_soon_threadsafe(loop.stop)
+        self.addCleanup(stop)
+
+        for _ in range(100):
+            if os.path.exists(path):
+                break
+            time.sleep(0.01)
+        with self.settings(SUMMARY_SERVER_SOCKET=path):
+            self.assertEqual(inference_utils.summarize(self.LONG_TEXT), (f"summary {len(self.LONG_TEXT)}", "model"))
+
+    def test_unreachable_server_falls_back(self):
+        with self.settings(SUMMARY_SERVER_SOCKET="/nonexistent/summarizer.sock"):
+            summary, source = inference_utils.summarize(self.LONG_TEXT)
+        self.assertEqual(source, "fallback")
+
+
+class SummarizerBackendTest(TestCase):
+    def test_model_id_follows_backend(self):
+        with self.settings(SUMMARIZER_BACKEND="int8"):
+            self.assertEqual(summarize_utils.model_id(), summarize_utils.model_name + ":int8")
+        with self.settings(SUMMARIZER_BACKEND="fp16"):
+            with self.assertRaises(ImproperlyConfigured):
+                summarize_utils.model_id()
+
+    def test_int8_backend_quantises_linear_layers(self):
+        from transformers import BartConfig, BartForConditionalGeneration
+        tiny = BartForConditionalGeneration(BartConfig(
+            vocab_size=64, d_model=16, encoder_layers=1, decoder_layers=1, encoder_attention_heads=2,
+            decoder_attention_heads=2, encoder_ffn_dim=32, decoder_ffn_dim=32,
+        ))
+        with mock.patch.object(summarize_utils.AutoModelForSeq2SeqLM, "from_pretrained", return_value=tiny):
+            model = summarize_utils.load_summarizer("int8")
+        quantised = [m for m in model.modules() if isinstance(m, torch.ao.nn.quantized.dynamic.Linear)]
+        self.assertTrue(quantised)
+        self.assertFalse([m for m in model.modules() if type(m) is torch.nn.Linear])
@@ -9,5 +9,13 @@ urlpatterns = [
     path("login/", views.login_view, name="login"),
     path("signup/", views.signup_view, name="signup"),
     path("author/", views.author_detail, name="author_detail"),
+    path("api/dashboard/series", views.dashboard_series, name="dashboard_series"),
+    path("api/search/semantic", views.semantic_search, name="semantic_search"),
+    path("api/search/cache", views.search_cache_stats, name="search_cache_stats"),
+    path("api/suggest", views.suggest, name="suggest"),
+    path("api/summary", views.summary, name="summary"),
+    path("api/summary/stream", views.summary_stream, name="summary_stream"),
+    path("api/summary/stats", views.summary_stats, name="summary_stats"),
+    path("api/models", views.model_stats, name="model_stats"),
 ]
 
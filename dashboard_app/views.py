@@ -1,16 +1,21 @@
 from django.shortcuts import render, redirect
 from django.db.models.functions import Length
 from dashboard_app.models import Papers
-from dashboard_app.summarize_utils import summarize_text
+from dashboard_app.inference_utils import summarize
 
 # Utility modules
-from dashboard_app import home_utils, search_utils, paper_utils, author_utils
+from dashboard_app import home_utils, search_utils, suggest_utils, paper_utils, author_utils, summary_utils, model_utils
 
 
 def home(request):
     return home_utils.DomainAnalysis(request)
 
 
+def dashboard_series(request):
+    # Handles /api/dashboard/series?min_year=xxxx&max_year=xxxx
+    return home_utils.DashboardSeriesApi(request)
+
+
 def profile(request):
     return render(request, "profile.html")
 
@@ -19,11 +24,46 @@ def search(request):
     return search_utils.Search_Query(request)
 
 
+def semantic_search(request):
+    # Handles /api/search/semantic?q=xxxx&k=xx
+    return search_utils.Semantic_Search_Api(request)
+
+
+def search_cache_stats(request):
+    # Handles /api/search/cache
+    return search_utils.Search_Cache_Stats(request)
+
+
+def suggest(request):
+    # Handles /api/suggest?q=xxxx
+    return suggest_utils.Suggest_Api(request)
+
+
 def paper_detail(request):
     # Handles /paper/?doi=xxxx
     return paper_utils.Render_Paper(request)
 
 
+def summary(request):
+    # Handles /api/summary?doi=xxxx&min_percent=xx&max_percent=xx
+    return summary_utils.Summary_Api(request)
+
+
+def summary_stream(request):
+    # Handles /api/summary/stream?doi=xxxx&min_percent=xx&max_percent=xx (server-sent events)
+    return summary_utils.Summary_Stream_Api(request)
+
+
+def summary_stats(request):
+    # Handles /api/summary/stats
+    return summary_utils.Summary_Stats(request)
+
+
+def model_stats(request):
+    # Handles /api/models
+    return model_utils.Model_Stats(request)
+
+
 def author_detail(request):
     # Handles /author/?name=xxxxx
     return author_utils.Render_Author(request)
@@ -70,7 +110,7 @@ def summarizer_lab(request):
     rows = []
     for p in papers:
         try:
-            s = summarize_text(p.abstract)
+            s, _ = summarize(p.abstract)
         except Exception:
             s = ""
 
@@ -96,10 +136,7 @@ def generate_summary_view(request):
 
         paper = Papers.objects.get(id=paper_id)
 
-        summary_text = summarize_text(
-            paper.abstract,
-            word_limit=word_limit
-        )
+        summary_text, _ = summarize(paper.abstract)
 
         return render(request, "paper_detail.html", {
             "paper": paper,
@@ -4,6 +4,7 @@ django.setup()
 
 from django.db import transaction
 from dashboard_app.models import Papers, Authors, Keywords, Author_Papers, Keywords_Paper
+from dashboard_app import rollup_utils
 
 @transaction.atomic
 def clean_duplicates():
@@ -105,6 +106,10 @@ def clean_duplicates():
         else:
             seen_kw_pairs.add(pair)
 
+    # ---------- ROLLUPS ----------
+    print("📊 Rebuilding keyword/year rollups...")
+    rollup_utils.rebuild_rollups()
+
     print("✅ Cleanup complete!")
 
 if __name__ == "__main__":